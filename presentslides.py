@@ -20,8 +20,10 @@ from pathlib import Path
 import pygame
 
 from shared import (
+    format_duration,
     prepare_slide_images,
     load_config,
+    read_ppm_header,
     resolve_slides,
 )
 
@@ -46,15 +48,6 @@ FONT_SIZE_SECTION = 30
 DEFAULT_PROGRESS_COLOR = (31, 67, 5)
 DEFAULT_PROGRESS_HEIGHT = 16
 
-def format_duration(seconds):
-    """Format seconds as a compact duration string like '3m 15s', '3m', or '45s'."""
-    if seconds >= 60:
-        mins = seconds // 60
-        secs = seconds % 60
-        return f"{mins}m {secs}s" if secs > 0 else f"{mins}m"
-    return f"{seconds}s"
-
-
 def color_from_str(color_str):
     """Convert a color string (hex or named) to an (R, G, B) tuple."""
     try:
@@ -64,11 +57,20 @@ def color_from_str(color_str):
         return DEFAULT_PROGRESS_COLOR
 
 
+def load_slide_surface(path):
+    """Load a cached slide image; raw PPM frames are wrapped without decoding."""
+    if path.suffix == ".ppm":
+        width, height, offset = read_ppm_header(path)
+        data = memoryview(path.read_bytes())[offset:]
+        return pygame.image.frombuffer(data, (width, height), "RGB")
+    return pygame.image.load(str(path))
+
+
 def build_slide_list(config):
     """Build an ordered list of slide metadata from config, referencing cached PNGs."""
     slides = []
     prev_title = None
-    for slide_cfg, pdf_cache_dir, total_pages, page_numbers in resolve_slides(config):
+    for slide_cfg, pdf_cache_dir, total_pages, pages in resolve_slides(config):
         until = slide_cfg.get("until", None)  # "HH:MM" wall clock
         duration = slide_cfg.get("duration", None)
         if until:
@@ -83,23 +85,22 @@ def build_slide_list(config):
         show_page_number = slide_cfg.get("show_page_number", False)
         show_countdown = slide_cfg.get("show_countdown", False)
 
-        for page_num in page_numbers:
-            cached_png = pdf_cache_dir / f"{page_num:03d}.png"
-            if cached_png.exists():
-                slides.append({
-                    "path": cached_png,
-                    "duration": duration,
-                    "show_progress_bar": show_progress_bar,
-                    "bar_color": bar_color,
-                    "bar_height": bar_height,
-                    "title": title,
-                    "show_page_number": show_page_number,
-                    "show_countdown": show_countdown,
-                    "until": until,
-                    "source": slide_cfg["filename"],
-                    "page": page_num,
-                    "total_pages": total_pages,
-                })
+        for page_num, cached_png, levels, _ in pages:
+            slides.append({
+                "path": cached_png,
+                "levels": levels,
+                "duration": duration,
+                "show_progress_bar": show_progress_bar,
+                "bar_color": bar_color,
+                "bar_height": bar_height,
+                "title": title,
+                "show_page_number": show_page_number,
+                "show_countdown": show_countdown,
+                "until": until,
+                "source": slide_cfg["filename"],
+                "page": page_num,
+                "total_pages": total_pages,
+            })
 
     return slides
 
@@ -192,16 +193,26 @@ class Presenter:
         pygame.key.set_repeat(400, 100)
 
     def _load_images(self):
+        # A deck rendered for a display at least twice the size of this one
+        # is loaded from the half-size rendition instead of full frames
+        use_half = (self.native_w * 2 <= self.resolution[0]
+                    and self.native_h * 2 <= self.resolution[1])
+
         self.slide_surfaces = []
         self.thumb_surfaces = []
         for slide in self.slides:
-            img = pygame.image.load(str(slide["path"])).convert()
+            path = slide["levels"].get("half") if use_half else None
+            img = load_slide_surface(path or slide["path"]).convert()
             self.slide_surfaces.append(img)
 
-            # Thumbnail for overview (fixed height, proportional width)
-            th = 150
-            tw = int(img.get_width() * th / img.get_height())
-            self.thumb_surfaces.append(pygame.transform.smoothscale(img, (tw, th)))
+            # Thumbnail for overview: pre-rendered when cached, else downscaled
+            thumb_path = slide["levels"].get("thumb")
+            if thumb_path is not None:
+                self.thumb_surfaces.append(load_slide_surface(thumb_path).convert())
+            else:
+                th = 150
+                tw = int(img.get_width() * th / img.get_height())
+                self.thumb_surfaces.append(pygame.transform.smoothscale(img, (tw, th)))
 
     # ------------------------------------------------------------------
     # Helpers
@@ -1327,6 +1338,10 @@ def main():
     parser.add_argument(
         "--config", "-c", default="config.toml", help="Config file (default: config.toml)"
     )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=None,
+        help="Render worker processes (default: render_workers setting, 0 = all cores)",
+    )
 
     args = parser.parse_args()
 
@@ -1339,7 +1354,7 @@ def main():
 
         # Stage 1: ensure PNGs are cached (reuses videoslides caching)
         print("Preparing slide images...")
-        prepare_slide_images(config)
+        prepare_slide_images(config, jobs=args.jobs)
 
         # Build slide list from cached PNGs
         slides = build_slide_list(config)
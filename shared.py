@@ -1,10 +1,103 @@
 """Shared utility functions for videoslides and presentslides."""
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import time
 import tomllib
+import zlib
 import fitz  # PyMuPDF
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Version of the on-disk cache layout (<root>/v<N>/<pdf hash>/<variant>/).
+CACHE_VERSION = 2
+
+# Version of the manifest.json format written into each cache directory.
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+# Completion journal of a `.tmp` staging directory, one JSON line per page.
+JOURNAL_NAME = "journal.jsonl"
+
+# Persistent index of PDF hashes, stored at the cache root.
+HASH_INDEX_NAME = "hash-index.json"
+
+# Per-cache-directory hit/miss counters, stored at the cache root.
+STATS_NAME = "stats.json"
+
+# Encoded per-slide video segments (videoslides' segments backend), stored at the cache root.
+SEGMENTS_NAME = "segments"
+
+# Bump whenever a change to render_page() alters the pixels it produces, so
+# images rendered by older code are not reused.
+RENDERER_VERSION = 1
+
+# Formats cached pages can be stored in, with their file suffix: PNG as
+# written by MuPDF, PNG with fast (zlib level 1) compression, or binary PPM,
+# which is uncompressed RGB that loaders can memory-map.
+IMAGE_FORMATS = {"png": ".png", "png-fast": ".png", "ppm": ".ppm"}
+
+# Ways videoslides can turn cached slide images into a video
+VIDEO_BACKENDS = ("moviepy", "concat", "segments")
+
+# Containers videoslides can write: a single file, or segmented HLS/DASH
+OUTPUT_FORMATS = ("file", "hls", "dash")
+
+# Video encoders an output_video target can use
+VIDEO_CODECS = ("libx264", "libx265", "libvpx-vp9", "ffv1")
+
+# Keys of an output_video target table
+OUTPUT_KEYS = {"path", "resolution", "codec", "encoder_profile", "encoder_preset", "output_format"}
+
+# Named encoder settings for slide content: the codec and the ffmpeg options
+# added to it. "x264" is libx264 at its defaults. The "still" profiles tune
+# x264 for static images at a constant quality (lower CRF = better, bigger),
+# "lossless" is an x264 intermediate for re-editing, and "vp9" is software
+# VP9 at constant quality for WebM.
+ENCODER_PROFILES = {
+    "x264": {"codec": "libx264", "params": []},
+    "still": {"codec": "libx264", "params": ["-tune", "stillimage", "-crf", "23"]},
+    "still-hq": {"codec": "libx264", "params": ["-tune", "stillimage", "-crf", "18"]},
+    "still-small": {"codec": "libx264", "params": ["-tune", "stillimage", "-crf", "28"]},
+    "lossless": {"codec": "libx264", "params": ["-qp", "0"]},
+    "vp9": {"codec": "libvpx-vp9", "params": ["-crf", "32", "-b:v", "0", "-row-mt", "1",
+                                              "-deadline", "good", "-cpu-used", "2"]},
+}
+
+# x264 speed/size trade-offs accepted by the encoder_preset setting
+ENCODER_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast",
+                   "medium", "slow", "slower", "veryslow")
+
+# Smaller renditions rendered next to each full-size page, as divisors of the
+# target resolution, so consumers can load the closest size instead of
+# downscaling full frames.
+PYRAMID_LEVELS = {"half": 2, "thumb": 8}
+
+# In-process memo of PDF hashes, keyed by (path, inode, size, mtime_ns), and
+# of loaded hash indexes, keyed by cache root.
+_hash_memo = {}
+_hash_indexes = {}
+
+
+def format_duration(seconds):
+    """Format seconds as a compact duration string like '3m 15s', '3m', or '45s'."""
+    if seconds >= 60:
+        mins = seconds // 60
+        secs = seconds % 60
+        return f"{mins}m {secs}s" if secs > 0 else f"{mins}m"
+    return f"{seconds}s"
+
 
 def parse_color(color_str):
     """Convert a color string ('black', 'white', or '#rrggbb') to an RGB tuple."""
@@ -17,13 +110,59 @@ def parse_color(color_str):
     return (0, 0, 0)
 
 
-def calculate_pdf_hash(pdf_path):
-    """Calculate SHA-256 hash of a PDF file."""
-    sha256_hash = hashlib.sha256()
-    with open(pdf_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(chunk)
-    return sha256_hash.hexdigest()
+def _load_hash_index(cache_root):
+    """Load the persistent PDF hash index for a cache root (memoized per process)."""
+    index = _hash_indexes.get(cache_root)
+    if index is None:
+        try:
+            with open(cache_root / HASH_INDEX_NAME, "rb") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {}
+        _hash_indexes[cache_root] = index
+    return index
+
+
+def _save_hash_index(cache_root, index):
+    """Atomically write the persistent PDF hash index."""
+    cache_root.mkdir(parents=True, exist_ok=True)
+    path = cache_root / HASH_INDEX_NAME
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def calculate_pdf_hash(pdf_path, cache_root=None, save=True):
+    """Calculate SHA-256 hash of a PDF file.
+
+    Hashes are memoized in-process and, when `cache_root` is given, in a
+    persistent index keyed on (path, inode, size, mtime_ns), so a file that
+    hasn't changed since it was last hashed is never read again. With
+    `save` off, the index is only read, for callers that don't write to the
+    cache.
+    """
+    path = str(Path(pdf_path).resolve())
+    st = os.stat(path)
+    stat_key = [st.st_ino, st.st_size, st.st_mtime_ns]
+
+    memo_key = (path, *stat_key)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+
+    index = _load_hash_index(cache_root) if cache_root is not None else None
+    entry = index.get(path) if index is not None else None
+    if entry is not None and entry["stat"] == stat_key:
+        digest = entry["sha256"]
+    else:
+        with open(path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        if index is not None and save:
+            index[path] = {"stat": stat_key, "sha256": digest}
+            _save_hash_index(cache_root, index)
+
+    _hash_memo[memo_key] = digest
+    return digest
 
 
 def get_cache_root(config):
@@ -32,26 +171,338 @@ def get_cache_root(config):
     return Path(config["settings"].get("output_cache", str(default_cache)))
 
 
-def get_pdf_cache_dir(config, pdf_file):
-    """Get the cache directory for a specific PDF file."""
+def get_render_params(config):
+    """Get the settings that determine what cached slide images look like."""
+    settings = config["settings"]
+    width, height = settings.get("resolution", [1920, 1080])
+    background = "%02x%02x%02x" % parse_color(settings.get("background_color", "black"))
+    return {
+        "width": width,
+        "height": height,
+        "background": background,
+        "renderer": RENDERER_VERSION,
+    }
+
+
+def get_variant_name(params):
+    """Get the cache subdirectory name for a set of render parameters."""
+    return f"{params['width']}x{params['height']}-{params['background']}-r{params['renderer']}"
+
+
+def get_pdf_cache_dir(config, pdf_file, params=None, pdf_hash=None, read_only=False):
+    """Get the cache directory for a specific PDF file.
+
+    Images are keyed by PDF content hash and render parameters, so variants
+    rendered at different resolutions or backgrounds live side by side.
+    With `read_only`, a newly computed hash isn't saved to the hash index.
+    """
     cache_root = get_cache_root(config)
-    pdf_hash = calculate_pdf_hash(pdf_file)
-    return cache_root / pdf_hash
+    if pdf_hash is None:
+        pdf_hash = calculate_pdf_hash(pdf_file, cache_root, save=not read_only)
+    if params is None:
+        params = get_render_params(config)
+    return cache_root / f"v{CACHE_VERSION}" / pdf_hash / get_variant_name(params)
 
 
-def get_cached_page_count(pdf_cache_dir):
-    """Get the total number of pages from a PDF cache directory.
+def load_manifest(pdf_cache_dir):
+    """Load the manifest of a PDF cache directory.
 
-    Returns None if the cache directory doesn't exist or is empty.
+    The manifest records the page count, the image file of every cached page
+    (with its size and SHA-256) and the render parameters, so readers need a
+    single file read instead of probing the directory. Returns None if the
+    cache directory or its manifest doesn't exist.
     """
-    if not pdf_cache_dir.exists():
+    try:
+        with open(pdf_cache_dir / MANIFEST_NAME, "rb") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
         return None
-
-    existing_pngs = list(pdf_cache_dir.glob("*.png"))
-    if not existing_pngs:
+    if manifest.get("version") != MANIFEST_VERSION:
         return None
+    return manifest
+
+
+def write_manifest(pdf_cache_dir, manifest):
+    """Atomically write the manifest of a PDF cache directory."""
+    path = pdf_cache_dir / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def manifest_pages(pdf_cache_dir, manifest, page_numbers):
+    """Return [(page_num, path, levels, entry)] for the requested pages present in the manifest.
+
+    `levels` maps the cached PYRAMID_LEVELS of a page ("half", "thumb") to
+    their image paths, and `entry` is the page's manifest entry, with the
+    checksums of its files.
+    """
+    pages = manifest["pages"]
+    result = []
+    for page_num in page_numbers:
+        entry = pages.get(str(page_num))
+        if entry is not None:
+            levels = {level: pdf_cache_dir / sub["file"]
+                      for level, sub in entry.get("levels", {}).items()}
+            result.append((page_num, pdf_cache_dir / entry["file"], levels, entry))
+    return result
+
+
+def page_files(entry):
+    """Yield the manifest entries of every file of a cached page, all levels included."""
+    yield entry
+    yield from entry.get("levels", {}).values()
+
+
+def _lock_file(f, blocking):
+    """Take an exclusive lock on an open file.
+
+    Returns False if the lock is held elsewhere and `blocking` is off;
+    otherwise polls until it is free.
+    """
+    while True:
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.2)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
-    return max(int(p.stem) for p in existing_pngs)
+
+def cache_lock_path(pdf_cache_dir):
+    """Get the lock file guarding writes to a cache directory."""
+    return pdf_cache_dir.with_name(pdf_cache_dir.name + ".lock")
+
+
+@contextmanager
+def cache_lock(pdf_cache_dir, blocking=True):
+    """Hold the cross-process lock for writing a cache directory.
+
+    Every process rendering into a cache directory (or its `.tmp` staging
+    directory) holds this lock, so concurrent runs wait for each other
+    instead of rendering the same pages twice. The lock is an OS file lock,
+    released automatically if its holder dies, so an abandoned lock never
+    blocks later runs. With `blocking` off, yields False instead of waiting
+    when the lock is held elsewhere.
+    """
+    lock_path = cache_lock_path(pdf_cache_dir)
+    while True:
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            f = open(lock_path, "a+b")
+        except FileNotFoundError:
+            # `cache gc` removed the emptied parent directory meanwhile
+            continue
+        with f:
+            locked = _lock_file(f, blocking=False)
+            if not locked and blocking:
+                print("⏳ Another process is rendering this deck, waiting for it...")
+                locked = _lock_file(f, blocking=True)
+            if locked and not _is_lock_file(f, lock_path):
+                # `cache gc` deleted the lock file while we waited for it
+                _unlock_file(f)
+                continue
+            try:
+                yield locked
+            finally:
+                if locked:
+                    _unlock_file(f)
+            return
+
+
+def _is_lock_file(f, lock_path):
+    """Whether an open lock file is still the one at `lock_path`."""
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(lock_path))
+    except FileNotFoundError:
+        return False
+
+
+def remove_orphan_locks(cache_root):
+    """Delete lock files of cache directories that no longer exist.
+
+    Each lock is taken first, so one a process is waiting for or holding is
+    left alone; a process that was waiting for a deleted lock file locks a
+    new one (see cache_lock()). PDF directories left empty are removed too.
+    Returns the number of lock files deleted.
+    """
+    removed = 0
+    for lock_path in (cache_root / f"v{CACHE_VERSION}").glob("*/*.lock"):
+        pdf_cache_dir = lock_path.with_suffix("")
+
+        def orphan():
+            return not (pdf_cache_dir.exists() or pdf_cache_dir.with_name(pdf_cache_dir.name + ".tmp").exists())
+
+        if not orphan():
+            continue
+        with cache_lock(pdf_cache_dir, blocking=False) as locked:
+            if locked and orphan():
+                try:
+                    lock_path.unlink()
+                    removed += 1
+                except OSError:
+                    # Windows can't delete a file that's open
+                    pass
+        try:
+            lock_path.parent.rmdir()
+        except OSError:
+            pass
+    return removed
+
+
+def iter_cache_dirs(cache_root):
+    """Yield (pdf_cache_dir, manifest) for every complete cache directory."""
+    for pdf_cache_dir in sorted((cache_root / f"v{CACHE_VERSION}").glob("*/*")):
+        if pdf_cache_dir.name.endswith(".tmp"):
+            continue
+        manifest = load_manifest(pdf_cache_dir)
+        if manifest is not None:
+            yield pdf_cache_dir, manifest
+
+
+def iter_segments(cache_root):
+    """Yield the encoded video segments in the cache."""
+    for pattern in ("*.mp4", "*.mkv"):
+        yield from (cache_root / SEGMENTS_NAME).glob(pattern)
+
+
+def cache_dir_key(cache_root, pdf_cache_dir):
+    """Get the '<pdf hash>/<variant>' key identifying a cache directory."""
+    return pdf_cache_dir.relative_to(cache_root / f"v{CACHE_VERSION}").as_posix()
+
+
+def cache_dir_size(manifest):
+    """Get the total bytes of the pages listed in a manifest."""
+    return sum(f["size"] for entry in manifest["pages"].values() for f in page_files(entry))
+
+
+def cache_dir_last_used(pdf_cache_dir):
+    """Get when a cache directory was last used, as a timestamp.
+
+    Use is recorded by touching the manifest, so this is its mtime.
+    """
+    return (pdf_cache_dir / MANIFEST_NAME).stat().st_mtime
+
+
+def mark_cache_dir_used(pdf_cache_dir):
+    """Record that a cache directory was just used (for LRU eviction)."""
+    os.utime(pdf_cache_dir / MANIFEST_NAME)
+
+
+def load_cache_stats(cache_root):
+    """Load the hit/miss counters, keyed by cache directory key."""
+    try:
+        with open(cache_root / STATS_NAME, "rb") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache_stats(cache_root, stats):
+    """Atomically write the hit/miss counters."""
+    path = cache_root / STATS_NAME
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def record_cache_stats(cache_root, usage):
+    """Add one run's {key: {"filename", "hits", "misses"}} page counts to the counters."""
+    if not usage:
+        return
+    stats = load_cache_stats(cache_root)
+    for key, counts in usage.items():
+        entry = stats.setdefault(key, {"filename": counts["filename"], "hits": 0, "misses": 0})
+        entry["filename"] = counts["filename"]
+        entry["hits"] += counts["hits"]
+        entry["misses"] += counts["misses"]
+    save_cache_stats(cache_root, stats)
+
+
+def remove_cache_dir(cache_root, pdf_cache_dir):
+    """Delete a cache directory, its parent if left empty, and its counters.
+
+    The lock file is kept: another process may have it open, and deleting it
+    would let a later run lock a new file while that one still holds the old.
+    `cache gc` deletes it later (see remove_orphan_locks()).
+    """
+    shutil.rmtree(pdf_cache_dir, ignore_errors=True)
+    try:
+        pdf_cache_dir.parent.rmdir()
+    except OSError:
+        pass
+    stats = load_cache_stats(cache_root)
+    if stats.pop(cache_dir_key(cache_root, pdf_cache_dir), None) is not None:
+        save_cache_stats(cache_root, stats)
+
+
+def get_cache_budget(config):
+    """Get (max_bytes, max_age_seconds) from config; None means unlimited."""
+    settings = config["settings"]
+    max_mb = settings.get("cache_max_size_mb")
+    max_days = settings.get("cache_max_age_days")
+    return (
+        max_mb * 1024 * 1024 if max_mb is not None else None,
+        max_days * 86400 if max_days is not None else None,
+    )
+
+
+def evict_cache(cache_root, max_bytes=None, max_age=None, keep=()):
+    """Delete least recently used cache directories and segments until within budget.
+
+    Directories and encoded segments unused for longer than `max_age` seconds
+    are removed, then the least recently used ones until the cache holds at
+    most `max_bytes`. Directories in `keep`, and ones another process holds
+    the lock of, are never removed, nor are segments still being encoded.
+    Returns [(path, bytes)] for the removed directories and segments.
+    """
+    if max_bytes is None and max_age is None:
+        return []
+
+    now = time.time()
+    entries = [(cache_dir_last_used(d), d, cache_dir_size(m)) for d, m in iter_cache_dirs(cache_root)]
+    for path in iter_segments(cache_root):
+        if ".partial." not in path.name:
+            stat = path.stat()
+            entries.append((stat.st_mtime, path, stat.st_size))
+    entries.sort()
+    total = sum(size for _, _, size in entries)
+    removed = []
+    for last_used, path, size in entries:
+        expired = max_age is not None and now - last_used > max_age
+        over_budget = max_bytes is not None and total > max_bytes
+        if not (expired or over_budget) or path in keep:
+            continue
+        if path.parent.name == SEGMENTS_NAME:
+            path.unlink(missing_ok=True)
+        else:
+            with cache_lock(path, blocking=False) as locked:
+                if not locked:
+                    continue
+                remove_cache_dir(cache_root, path)
+        total -= size
+        removed.append((path, size))
+    return removed
+
+
+def cache_entry_name(cache_root, path):
+    """Name a cache directory or segment returned by evict_cache() for messages."""
+    if path.parent.name == SEGMENTS_NAME:
+        return f"{SEGMENTS_NAME}/{path.name}"
+    return cache_dir_key(cache_root, path)
 
 
 def parse_page_range(pages_str, total_pages):
@@ -71,8 +522,16 @@ def parse_page_range(pages_str, total_pages):
     return sorted(set(pages))
 
 
-def resolve_slides(config):
-    """Yield (slide_cfg, pdf_cache_dir, total_pages, page_numbers) for each cached slide."""
+def resolve_slides(config, include_uncached=False):
+    """Yield (slide_cfg, pdf_cache_dir, total_pages, pages) for each cached slide.
+
+    `pages` is a list of (page_num, image_path, levels, entry) for the
+    selected pages that are present in the cache, read from the cache
+    manifest; see manifest_pages(). With `include_uncached`, slides and
+    pages missing from the cache are yielded too, with an image_path and
+    entry of None, for callers that render them from the PDF themselves;
+    those bypass the cache, so nothing is written to it.
+    """
     for slide_cfg in config["slides"]:
         filename = slide_cfg["filename"]
         pages_spec = slide_cfg.get("pages", "all")
@@ -82,14 +541,29 @@ def resolve_slides(config):
             print(f"Warning: '{filename}' not found, skipping")
             continue
 
-        pdf_cache_dir = get_pdf_cache_dir(config, pdf_file)
-        total_pages = get_cached_page_count(pdf_cache_dir)
-        if total_pages is None:
+        pdf_cache_dir = get_pdf_cache_dir(config, pdf_file, read_only=include_uncached)
+        manifest = load_manifest(pdf_cache_dir)
+        if manifest is None and not include_uncached:
             print(f"Warning: no cache for '{filename}', skipping")
             continue
 
+        if manifest is None:
+            with fitz.open(pdf_file) as doc:
+                total_pages = len(doc)
+            manifest = {"page_count": total_pages, "pages": {}}
+
+        total_pages = manifest["page_count"]
         page_numbers = parse_page_range(pages_spec, total_pages)
-        yield slide_cfg, pdf_cache_dir, total_pages, page_numbers
+        pages = manifest_pages(pdf_cache_dir, manifest, page_numbers)
+        if len(pages) < len(page_numbers):
+            cached = {page[0] for page in pages}
+            missing = sorted(set(page_numbers) - cached)
+            if include_uncached:
+                pages = sorted(pages + [(n, None, {}, None) for n in missing if n <= total_pages],
+                               key=lambda page: page[0])
+            else:
+                print(f"Warning: page(s) {missing} not in cache for '{filename}', skipping them")
+        yield slide_cfg, pdf_cache_dir, total_pages, pages
 
 
 def load_config(config_file="config.toml"):
@@ -109,7 +583,10 @@ def load_config(config_file="config.toml"):
 
     KNOWN_SETTINGS = {
         "output_cache", "output_video", "resolution", "fps",
-        "keyframe_interval", "background_color",
+        "keyframe_interval", "background_color", "render_workers",
+        "cache_max_size_mb", "cache_max_age_days", "image_format",
+        "video_backend", "encode_workers", "vfr", "seek_index", "output_format",
+        "encoder_preset", "encoder_profile", "info_bar",
     }
     KNOWN_SLIDE_KEYS = {
         "filename", "duration", "until", "pages", "title",
@@ -127,6 +604,67 @@ def load_config(config_file="config.toml"):
                 and all(isinstance(v, int) and v > 0 for v in res)):
             raise RuntimeError(f"'resolution' must be [width, height], got {res}")
 
+    outputs = config.get("settings", {}).get("output_video")
+    if isinstance(outputs, list):
+        if not outputs:
+            raise RuntimeError("'output_video' must list at least one output")
+        for output in outputs:
+            if isinstance(output, str):
+                continue
+            if not (isinstance(output, dict) and isinstance(output.get("path"), str)):
+                raise RuntimeError(f"Each 'output_video' entry must be a filename or a table with a 'path', got {output!r}")
+            for key in output:
+                if key not in OUTPUT_KEYS:
+                    raise RuntimeError(f"Unknown key '{key}' in output '{output['path']}'")
+            res = output.get("resolution")
+            if res is not None and not (isinstance(res, list) and len(res) == 2
+                                        and all(isinstance(v, int) and v > 0 for v in res)):
+                raise RuntimeError(f"'resolution' of output '{output['path']}' must be [width, height], got {res}")
+            for key, allowed in (("codec", VIDEO_CODECS), ("encoder_preset", ENCODER_PRESETS),
+                                 ("encoder_profile", ENCODER_PROFILES), ("output_format", OUTPUT_FORMATS)):
+                if key in output and output[key] not in allowed:
+                    raise RuntimeError(f"'{key}' of output '{output['path']}' must be one of "
+                                       f"{', '.join(allowed)}, got {output[key]!r}")
+            if "codec" in output and "encoder_profile" in output:
+                raise RuntimeError(f"Output '{output['path']}' sets both 'codec' and 'encoder_profile'")
+    elif outputs is not None and not isinstance(outputs, str):
+        raise RuntimeError(f"'output_video' must be a filename or a list of outputs, got {outputs!r}")
+
+    for key in ("vfr", "seek_index", "info_bar"):
+        value = config.get("settings", {}).get(key)
+        if value is not None and not isinstance(value, bool):
+            raise RuntimeError(f"'{key}' must be true or false, got {value!r}")
+
+    for key in ("render_workers", "encode_workers"):
+        workers = config.get("settings", {}).get(key)
+        if workers is not None and not (isinstance(workers, int) and workers >= 0):
+            raise RuntimeError(f"'{key}' must be a non-negative integer, got {workers!r}")
+
+    image_format = config.get("settings", {}).get("image_format")
+    if image_format is not None and image_format not in IMAGE_FORMATS:
+        raise RuntimeError(f"'image_format' must be one of {', '.join(IMAGE_FORMATS)}, got {image_format!r}")
+
+    output_format = config.get("settings", {}).get("output_format")
+    if output_format is not None and output_format not in OUTPUT_FORMATS:
+        raise RuntimeError(f"'output_format' must be one of {', '.join(OUTPUT_FORMATS)}, got {output_format!r}")
+
+    video_backend = config.get("settings", {}).get("video_backend")
+    if video_backend is not None and video_backend not in VIDEO_BACKENDS:
+        raise RuntimeError(f"'video_backend' must be one of {', '.join(VIDEO_BACKENDS)}, got {video_backend!r}")
+
+    encoder_preset = config.get("settings", {}).get("encoder_preset")
+    if encoder_preset is not None and encoder_preset not in ENCODER_PRESETS:
+        raise RuntimeError(f"'encoder_preset' must be one of {', '.join(ENCODER_PRESETS)}, got {encoder_preset!r}")
+
+    encoder_profile = config.get("settings", {}).get("encoder_profile")
+    if encoder_profile is not None and encoder_profile not in ENCODER_PROFILES:
+        raise RuntimeError(f"'encoder_profile' must be one of {', '.join(ENCODER_PROFILES)}, got {encoder_profile!r}")
+
+    for key in ("cache_max_size_mb", "cache_max_age_days"):
+        value = config.get("settings", {}).get(key)
+        if value is not None and not (isinstance(value, (int, float)) and value > 0):
+            raise RuntimeError(f"'{key}' must be a positive number, got {value!r}")
+
     for i, slide in enumerate(config["slides"], 1):
         label = f"Slide {i} ('{slide.get('filename', '?')}')"
 
@@ -146,105 +684,524 @@ def load_config(config_file="config.toml"):
     return config
 
 
-def prepare_slide_images(config):
+def get_workers(config, setting, jobs=None):
+    """Return the number of worker processes a `*_workers` setting asks for.
+
+    An explicit `jobs` value (from --jobs) overrides the setting; 0 means
+    one worker per CPU core.
+    """
+    workers = jobs if jobs is not None else config["settings"].get(setting, 1)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def get_render_workers(config, jobs=None):
+    """Return the number of render worker processes to use (see get_workers())."""
+    return get_workers(config, "render_workers", jobs)
+
+
+def prepare_slide_images(config, jobs=None, evict=True):
     """Prepare slide images from PDFs using config settings.
 
     Extracts resolution from config and ensures all PDFs are converted to PNGs.
+    Returns the cache directories used; see pdfs_to_pngs() for `evict`.
     """
     resolution = config["settings"].get("resolution", [1920, 1080])
-    pdfs_to_pngs(config, target_width=resolution[0], target_height=resolution[1])
+    return pdfs_to_pngs(config, target_width=resolution[0], target_height=resolution[1],
+                        workers=get_render_workers(config, jobs), evict=evict)
 
 
-def pdfs_to_pngs(config, target_width=1920, target_height=1080):
-    """Convert PDF files to PNG images based on config."""
-    cache_root = get_cache_root(config)
-    cache_root.mkdir(parents=True, exist_ok=True)
+def render_page(page, target_width, target_height, bg_rgb):
+    """Render a PDF page letterboxed onto a target-sized background pixmap."""
+    # Scale to fit within target while preserving aspect ratio
+    zoom = min(target_width / page.rect.width, target_height / page.rect.height)
+    mat = fitz.Matrix(zoom, zoom)
+    pix = page.get_pixmap(matrix=mat)
 
-    background_color = config["settings"].get("background_color", "black")
+    # Letterbox: create a target-sized pixmap pre-filled with the background
+    # color (Pixmap.set_rect fills pixel by pixel and is slow at 4K)
+    bg = fitz.Pixmap(fitz.csRGB, target_width, target_height,
+                     bytes(bg_rgb) * (target_width * target_height), 0)
 
-    print("🧩 Starting PDF → PNG conversion from config...")
+    # Blit rendered page into center in a single copy
+    pix.set_origin((target_width - pix.width) // 2, (target_height - pix.height) // 2)
+    bg.copy(pix, pix.irect)
 
-    for order, slide in enumerate(config["slides"], start=1):
-        filename = slide["filename"]
-        duration = slide.get("duration", 15) or 15
-        pages_spec = slide.get("pages", "all")
+    return bg
 
-        pdf_file = Path(filename)
-        if not pdf_file.exists():
-            print(f"⚠️ Skipping '{filename}' - file not found")
+
+# Indirect references ("12 0 R") in PDF object source, and the keys that
+# point back up the page tree (or hold structure-tree numbering) rather than
+# at anything the page draws.
+_PDF_REF_RE = re.compile(rb"(\d+) (\d+) R")
+_PDF_BACKLINK_RE = re.compile(rb"/(?:Parent|P|StructParents?)\s*(?:\d+ \d+ R|\d+)")
+
+
+def _pdf_object_digest(doc, root, memo, pages):
+    """Hash a PDF object and everything it references, independent of xref numbers.
+
+    References to page objects in `pages` ({xref: page index}), such as link
+    destinations, hash as the page index instead of being followed, so a page
+    isn't hashed with every page it links to. The traversal is iterative.
+    Objects on a reference cycle hash a placeholder where the cycle closes,
+    which depends on where the walk entered the cycle, so only hashes that
+    didn't involve one are stored in `memo` for reuse by later pages.
+    """
+    results = {}  # xref: (digest, involves a cycle)
+    sources = {}
+    stack = [root]
+    while stack:
+        xref = stack[-1]
+        if xref in results or xref in memo:
+            stack.pop()
             continue
 
-        print(f"\n📄 Processing '{filename}' (order={order}, duration={duration}s, pages={pages_spec})...")
+        if xref not in sources:
+            # First visit: queue the referenced objects, hash this one after them
+            source = _PDF_BACKLINK_RE.sub(b"", doc.xref_object(xref, compressed=True).encode())
+            sources[xref] = source
+            for m in _PDF_REF_RE.finditer(source):
+                ref = int(m.group(1))
+                if ref not in pages and ref not in results and ref not in memo and ref not in sources:
+                    stack.append(ref)
+            continue
+
+        cyclic = False
+
+        def replace(m):
+            nonlocal cyclic
+            ref = int(m.group(1))
+            if ref in pages:
+                return b"page%d" % pages[ref]
+            if ref in memo:
+                return memo[ref].hex().encode()
+            if ref in results:
+                cyclic |= results[ref][1]
+                return results[ref][0].hex().encode()
+            # Still being hashed further down the stack: a reference cycle
+            cyclic = True
+            return b"cycle"
+
+        h = hashlib.sha256(_PDF_REF_RE.sub(replace, sources[xref]))
+        if doc.xref_is_stream(xref):
+            h.update(doc.xref_stream_raw(xref) or b"")
+        results[xref] = (h.digest(), cyclic)
+        if not cyclic:
+            memo[xref] = h.digest()
+        stack.pop()
+
+    return memo[root] if root in memo else results[root][0]
+
+
+def page_fingerprint(page, memo=None):
+    """Fingerprint what a page draws, for matching pages across PDF revisions.
+
+    Hashes the page object with its content streams, resources, and
+    annotations (following references, but not back up the page tree), so an
+    unchanged page of an edited PDF gets the same fingerprint even when the
+    file's object numbers shift. Other pages referenced by links are hashed
+    by page index. `memo` caches object hashes across pages of one document.
+    """
+    doc = page.parent
+    memo = {} if memo is None else memo
+    if "pages" not in memo:
+        memo["pages"] = {doc.page_xref(i): i for i in range(doc.page_count)}
+    pages = memo["pages"]
+    h = hashlib.sha256(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(_pdf_object_digest(doc, page.xref, memo, pages))
+
+    # Resources may be inherited from an ancestor in the page tree
+    xref = page.xref
+    while doc.xref_get_key(xref, "Resources")[0] == "null":
+        kind, parent = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(parent.split()[0])
+        kind, resources = doc.xref_get_key(xref, "Resources")
+        if kind == "xref":
+            h.update(_pdf_object_digest(doc, int(resources.split()[0]), memo, pages))
+        elif kind == "dict":
+            h.update(resources.encode())
+    return h.hexdigest()
+
+
+def _find_fingerprint_matches(pdf_cache_dir, fingerprints):
+    """Find cached images of pages with the given fingerprints in other PDFs.
+
+    Looks through the caches of other PDF revisions rendered with the same
+    parameters. Returns {fingerprint: path}.
+    """
+    wanted = set(fingerprints)
+    matches = {}
+    variant = pdf_cache_dir.name
+    for other_dir in pdf_cache_dir.parent.parent.glob(f"*/{variant}"):
+        if other_dir == pdf_cache_dir:
+            continue
+        manifest = load_manifest(other_dir)
+        if manifest is None:
+            continue
+        for entry in manifest["pages"].values():
+            fingerprint = entry.get("fingerprint")
+            if fingerprint in wanted and fingerprint not in matches:
+                matches[fingerprint] = (other_dir / entry["file"], entry)
+        if len(matches) == len(wanted):
+            break
+    return matches
+
+
+def _reuse_page(src, src_entry, out_dir, page_num):
+    """Link (or copy) a matching cached page into `out_dir` and return its manifest entry."""
+    def link(src_file, name):
+        try:
+            os.link(src_file, out_dir / name)
+        except OSError:
+            shutil.copy2(src_file, out_dir / name)
+
+    link(src, f"{page_num:03d}{src.suffix}")
+    entry = dict(src_entry, file=f"{page_num:03d}{src.suffix}", levels={})
+    for level, sub in src_entry.get("levels", {}).items():
+        name = f"{page_num:03d}-{level}{Path(sub['file']).suffix}"
+        link(src.with_name(sub["file"]), name)
+        entry["levels"][level] = dict(sub, file=name)
+    return entry
+
+
+def _encode_png_fast(pix):
+    """Encode an RGB pixmap as PNG using the fastest zlib compression level."""
+    samples, stride = pix.samples, pix.stride
+    raw = b"".join(b"\x00" + samples[y * stride:(y + 1) * stride] for y in range(pix.height))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", pix.width, pix.height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 1))
+            + chunk(b"IEND", b""))
+
+
+def encode_image(pix, image_format):
+    """Encode an RGB pixmap in one of IMAGE_FORMATS."""
+    if image_format == "ppm":
+        return pix.tobytes("ppm")
+    if image_format == "png-fast":
+        return _encode_png_fast(pix)
+    return pix.tobytes("png")
+
+
+def read_ppm_header(path):
+    """Return (width, height, data_offset) of a binary PPM written by encode_image()."""
+    with open(path, "rb") as f:
+        head = f.read(64)
+    magic, dims, maxval, _ = head.split(b"\n", 3)
+    width, height = map(int, dims.split())
+    return width, height, len(magic) + len(dims) + len(maxval) + 3
 
-        # Calculate PDF hash for caching
-        pdf_hash = calculate_pdf_hash(pdf_file)
-        pdf_cache_dir = get_pdf_cache_dir(config, pdf_file)
-        pdf_temp_dir = cache_root / f"{pdf_hash}.tmp"
 
-        # Check if we need to render pages
-        total_pages = get_cached_page_count(pdf_cache_dir)
-        if total_pages is not None:
-            # Cache exists with pages
-            print(f"📦 Found cache for '{filename}' (hash: {pdf_hash[:8]}...) with {total_pages} pages")
+def convert_to_png(src, dst):
+    """Write a cached slide image to `dst` as PNG, copying it if it already is one."""
+    if Path(src).suffix == ".png":
+        shutil.copy2(src, dst)
+    else:
+        fitz.Pixmap(str(src)).save(str(dst))
+
+
+def load_image_samples(path):
+    """Decode a cached slide image into raw RGB samples."""
+    return fitz.Pixmap(str(path)).samples
+
+
+def _save_image(pix, out_dir, name, image_format):
+    """Write an image into `out_dir` and return its manifest entry."""
+    data = encode_image(pix, image_format)
+    name += IMAGE_FORMATS[image_format]
+    (out_dir / name).write_bytes(data)
+    return {"file": name, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def _render_and_save_page(page, out_dir, page_num, target_width, target_height, bg_rgb,
+                          image_format):
+    """Render a page and its PYRAMID_LEVELS into `out_dir`; return its manifest entry.
+
+    Smaller levels are rendered by MuPDF at a lower zoom, not downscaled.
+    """
+    bg = render_page(page, target_width, target_height, bg_rgb)
+    entry = _save_image(bg, out_dir, f"{page_num:03d}", image_format)
+    entry["levels"] = {}
+    for level, divisor in PYRAMID_LEVELS.items():
+        small = render_page(page, max(target_width // divisor, 1),
+                            max(target_height // divisor, 1), bg_rgb)
+        entry["levels"][level] = _save_image(small, out_dir, f"{page_num:03d}-{level}", image_format)
+    return entry
+
+
+# Documents opened by a render worker process, keyed by PDF path. Each worker
+# opens its own fitz.Document; documents are never shared across processes.
+_worker_docs = {}
+
+
+def _render_page_job(pdf_path, page_idx, out_dir, target_width, target_height, bg_rgb,
+                     image_format):
+    """Render one page into `out_dir` inside a render worker process."""
+    doc = _worker_docs.get(pdf_path)
+    if doc is None:
+        doc = _worker_docs[pdf_path] = fitz.open(pdf_path)
+    return page_idx, _render_and_save_page(doc[page_idx], Path(out_dir), page_idx + 1,
+                                           target_width, target_height, bg_rgb, image_format)
+
+
+def render_page_samples(pdf_path, page_idx, target_width, target_height, bg_rgb):
+    """Render one letterboxed page straight to raw RGB samples, bypassing the cache.
+
+    Safe to run in a render worker process; see _render_page_job().
+    """
+    doc = _worker_docs.get(pdf_path)
+    if doc is None:
+        doc = _worker_docs[pdf_path] = fitz.open(pdf_path)
+    return render_page(doc[page_idx], target_width, target_height, bg_rgb).samples
+
+
+def _render_pages(pdf_file, doc, page_numbers, out_dir, target_width, target_height,
+                  bg_rgb, image_format, pool, on_page):
+    """Render the given pages of `doc` into `out_dir`, using `pool` if given.
+
+    Calls `on_page(page_num, entry)` with each page's manifest entry as soon
+    as the page is written.
+    """
+    if pool is None:
+        for done, page_num in enumerate(page_numbers, start=1):
+            print(f"🔧 Rendering page {page_num} ({done}/{len(page_numbers)})...")
+            on_page(page_num, _render_and_save_page(doc[page_num - 1], out_dir, page_num,
+                                                    target_width, target_height, bg_rgb,
+                                                    image_format))
+        return
+
+    futures = [
+        pool.submit(_render_page_job, str(pdf_file.resolve()), page_num - 1,
+                    str(out_dir), target_width, target_height, bg_rgb, image_format)
+        for page_num in page_numbers
+    ]
+    for done, future in enumerate(as_completed(futures), start=1):
+        page_idx, entry = future.result()
+        on_page(page_idx + 1, entry)
+        print(f"🔧 Rendered page {page_idx + 1} ({done}/{len(page_numbers)})")
+
+
+def _read_journal(pdf_temp_dir):
+    """Read the pages a staging directory's journal lists and that are still intact.
+
+    Each journal line is written only after all files of a page are, so a
+    page rendered by an interrupted run is kept if its files still match
+    the sizes and checksums recorded for them.
+    """
+    pages = {}
+    try:
+        with open(pdf_temp_dir / JOURNAL_NAME, encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return pages
+
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # torn final line of a run that died mid-write
+        entry = record["entry"]
+        for f in page_files(entry):
+            try:
+                data = (pdf_temp_dir / f["file"]).read_bytes()
+            except FileNotFoundError:
+                break
+            if len(data) != f["size"] or hashlib.sha256(data).hexdigest() != f["sha256"]:
+                break
         else:
-            # No cache, need to render all pages
-            print(f"🆕 No cache found, rendering all pages for '{filename}' (hash: {pdf_hash[:8]}...)")
+            pages[str(record["page"])] = entry
+    return pages
 
-            # Create temporary directory
-            pdf_temp_dir.mkdir(exist_ok=True)
 
-            doc = fitz.open(pdf_file)
-            total_pages = len(doc)
-            print(f"🔄 Rendering {total_pages} page(s)...")
+def _fill_pdf_cache(pdf_file, pdf_hash, pdf_cache_dir, manifest, doc, page_numbers,
+                    params, image_format, pool):
+    """Render `page_numbers` of a PDF into its cache directory.
 
-            bg_rgb = parse_color(background_color)
+    A new cache directory is built in a `.tmp` sibling and renamed into place
+    once its manifest is written. Pages added to an existing cache are moved
+    in one by one before the manifest is rewritten to list them, so readers
+    only ever see pages that are complete. Every finished page is recorded in
+    a journal in the `.tmp` directory, so a run that is interrupted resumes
+    where it stopped. The caller must hold cache_lock(pdf_cache_dir).
+    Returns the updated manifest.
+    """
+    pdf_temp_dir = pdf_cache_dir.with_name(pdf_cache_dir.name + ".tmp")
 
-            for page_idx in range(total_pages):
-                print(f"🔧 Rendering page {page_idx + 1}/{total_pages}...")
-                page = doc[page_idx]
+    # We hold the lock, so a staging directory left behind is from a run
+    # that was interrupted; keep the pages its journal vouches for
+    pages = _read_journal(pdf_temp_dir)
+    if pages:
+        print(f"⏯️ Resuming: {len(pages)} page(s) already rendered by an interrupted run")
+    pdf_temp_dir.mkdir(parents=True, exist_ok=True)
+    page_numbers = [n for n in page_numbers if str(n) not in pages]
 
-                # Scale to fit within target while preserving aspect ratio
-                zoom = min(target_width / page.rect.width, target_height / page.rect.height)
-                mat = fitz.Matrix(zoom, zoom)
-                pix = page.get_pixmap(matrix=mat)
+    # Reuse unchanged pages from caches of earlier revisions of this PDF
+    memo = {}
+    fingerprints = {n: page_fingerprint(doc[n - 1], memo) for n in page_numbers}
+    matches = _find_fingerprint_matches(pdf_cache_dir, fingerprints.values())
 
-                # Letterbox: create target-sized pixmap with background color
-                bg = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, target_width, target_height), 0)
-                bg.set_rect(bg.irect, bg_rgb)
+    with open(pdf_temp_dir / JOURNAL_NAME, "a", encoding="utf-8") as journal:
+        def record(page_num, entry):
+            entry["fingerprint"] = fingerprints[page_num]
+            pages[str(page_num)] = entry
+            journal.write(json.dumps({"page": page_num, "entry": entry}) + "\n")
+            journal.flush()
 
-                # Copy rendered page into center
-                left = (target_width - pix.width) // 2
-                top = (target_height - pix.height) // 2
-                src = pix.samples_mv
-                dst = bg.samples_mv
-                for y in range(pix.height):
-                    s = y * pix.stride
-                    d = (top + y) * bg.stride + left * 3
-                    dst[d:d + pix.width * 3] = src[s:s + pix.width * 3]
+        reused = 0
+        for page_num, fingerprint in fingerprints.items():
+            if fingerprint in matches:
+                record(page_num, _reuse_page(*matches[fingerprint], pdf_temp_dir, page_num))
+                reused += 1
+        if reused:
+            print(f"♻️ Reused {reused} unchanged page(s) from an earlier revision")
 
-                temp_png = pdf_temp_dir / f"{page_idx + 1:03d}.png"
-                bg.save(str(temp_png))
+        bg_rgb = parse_color("#" + params["background"])
+        to_render = [n for n in page_numbers if str(n) not in pages]
+        _render_pages(pdf_file, doc, to_render, pdf_temp_dir, params["width"], params["height"],
+                      bg_rgb, image_format, pool, record)
 
-            doc.close()
+    (pdf_temp_dir / JOURNAL_NAME).unlink()
 
-            # Atomically move temporary directory to final location
-            pdf_temp_dir.rename(pdf_cache_dir)
-            print(f"✅ Cache created for '{filename}' with {total_pages} pages")
+    if manifest is None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "pdf_hash": pdf_hash,
+            "params": params,
+            "page_count": len(doc),
+            "pages": dict(sorted(pages.items(), key=lambda kv: int(kv[0]))),
+        }
+        write_manifest(pdf_temp_dir, manifest)
 
-        # Parse which pages to include for this slide
-        page_numbers = parse_page_range(pages_spec, total_pages)
-        print(f"📋 Using pages: {page_numbers}")
+        # A directory without a valid manifest is a broken cache; replace it
+        if pdf_cache_dir.exists():
+            shutil.rmtree(pdf_cache_dir)
+
+        # Atomically move temporary directory to final location
+        pdf_temp_dir.rename(pdf_cache_dir)
+    else:
+        for entry in pages.values():
+            for f in page_files(entry):
+                os.replace(pdf_temp_dir / f["file"], pdf_cache_dir / f["file"])
+        manifest["pages"].update(pages)
+        manifest["pages"] = dict(sorted(manifest["pages"].items(), key=lambda kv: int(kv[0])))
+        write_manifest(pdf_cache_dir, manifest)
+        shutil.rmtree(pdf_temp_dir)
+
+    return manifest
+
+
+def pdfs_to_pngs(config, target_width=1920, target_height=1080, workers=1, evict=True):
+    """Convert PDF files to PNG images based on config.
+
+    Only the pages selected by each slide's `pages` spec are rendered; pages
+    requested later are added to the existing cache. With `workers` > 1,
+    pages are rendered in a pool of worker processes. Returns the set of
+    cache directories used. With `evict` off, the cache budget is left for
+    the caller to enforce (see enforce_cache_budget()), e.g. once the
+    segments its output reuses are known.
+    """
+    cache_root = get_cache_root(config)
+    cache_root.mkdir(parents=True, exist_ok=True)
+
+    params = dict(get_render_params(config), width=target_width, height=target_height)
+    image_format = config["settings"].get("image_format", "png")
 
-        # Verify all requested pages exist in cache
-        for page_num in page_numbers:
-            if page_num > total_pages:
-                print(f"⚠️ Page {page_num} doesn't exist in {filename}, skipping")
+    print("🧩 Starting PDF → PNG conversion from config...")
+
+    usage = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for order, slide in enumerate(config["slides"], start=1):
+            filename = slide["filename"]
+            duration = slide.get("duration", 15) or 15
+            pages_spec = slide.get("pages", "all")
+
+            pdf_file = Path(filename)
+            if not pdf_file.exists():
+                print(f"⚠️ Skipping '{filename}' - file not found")
                 continue
 
-            cached_png = pdf_cache_dir / f"{page_num:03d}.png"
-            if not cached_png.exists():
-                print(f"⚠️ Page {page_num} missing from cache for '{filename}'")
+            print(f"\n📄 Processing '{filename}' (order={order}, duration={duration}s, pages={pages_spec})...")
+
+            # Calculate PDF hash for caching
+            pdf_hash = calculate_pdf_hash(pdf_file, cache_root)
+            pdf_cache_dir = get_pdf_cache_dir(config, pdf_file, params, pdf_hash)
+
+            # The manifest knows the page count; without one we must open the PDF
+            doc = None
+            manifest = load_manifest(pdf_cache_dir)
+            if manifest is not None:
+                total_pages = manifest["page_count"]
+                print(f"📦 Found cache for '{filename}' (hash: {pdf_hash[:8]}..., "
+                      f"{pdf_cache_dir.name}) with {len(manifest['pages'])}/{total_pages} pages")
             else:
+                doc = fitz.open(pdf_file)
+                total_pages = len(doc)
+                print(f"🆕 No cache found for '{filename}' (hash: {pdf_hash[:8]}...)")
+
+            # Parse which pages to include for this slide
+            page_numbers = parse_page_range(pages_spec, total_pages)
+            print(f"📋 Using pages: {page_numbers}")
+
+            for page_num in page_numbers:
+                if page_num > total_pages:
+                    print(f"⚠️ Page {page_num} doesn't exist in {filename}, skipping")
+            page_numbers = [n for n in page_numbers if n <= total_pages]
+
+            # Render only the selected pages the cache doesn't hold yet
+            cached = manifest["pages"] if manifest is not None else {}
+            missing = [n for n in page_numbers if str(n) not in cached]
+            if manifest is not None and not missing:
+                mark_cache_dir_used(pdf_cache_dir)
+
+            counts = usage.setdefault(cache_dir_key(cache_root, pdf_cache_dir),
+                                      {"filename": filename, "hits": 0, "misses": 0, "dir": pdf_cache_dir})
+            counts["hits"] += len(page_numbers) - len(missing)
+            counts["misses"] += len(missing)
+            if missing:
+                with cache_lock(pdf_cache_dir):
+                    # Another process may have rendered them while we waited
+                    manifest = load_manifest(pdf_cache_dir)
+                    cached = manifest["pages"] if manifest is not None else {}
+                    missing = [n for n in missing if str(n) not in cached]
+                    if missing:
+                        if doc is None:
+                            doc = fitz.open(pdf_file)
+                        print(f"🔄 Caching {len(missing)} page(s)"
+                              + (f" with {workers} workers..." if pool else "..."))
+                        manifest = _fill_pdf_cache(pdf_file, pdf_hash, pdf_cache_dir, manifest,
+                                                   doc, missing, params, image_format, pool)
+                    print(f"✅ Cache for '{filename}' now holds "
+                          f"{len(manifest['pages'])}/{total_pages} pages")
+            if doc is not None:
+                doc.close()
+
+            for page_num in page_numbers:
                 print(f"✅ Page {page_num} ready")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    record_cache_stats(cache_root, usage)
+
+    used = {counts["dir"] for counts in usage.values()}
+    if evict:
+        enforce_cache_budget(config, used)
 
     print(f"\n🎬 PNG conversion complete! Slides saved in '{cache_root.resolve()}'")
+    return used
+
+
+def enforce_cache_budget(config, keep=()):
+    """Evict what's past the configured cache budget, except the paths in `keep`."""
+    cache_root = get_cache_root(config)
+    max_bytes, max_age = get_cache_budget(config)
+    for path, size in evict_cache(cache_root, max_bytes, max_age, keep):
+        print(f"🧹 Evicted {cache_entry_name(cache_root, path)} ({size / 1e6:.1f} MB)")
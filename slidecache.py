@@ -0,0 +1,270 @@
+"""Inspect and maintain the shared slide image cache (`videoslides cache ...`)."""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+from shared import (
+    CACHE_VERSION,
+    HASH_INDEX_NAME,
+    SEGMENTS_NAME,
+    STATS_NAME,
+    cache_dir_key,
+    cache_dir_last_used,
+    cache_dir_size,
+    cache_entry_name,
+    cache_lock,
+    evict_cache,
+    get_cache_budget,
+    get_cache_root,
+    iter_cache_dirs,
+    iter_segments,
+    load_cache_stats,
+    load_config,
+    load_manifest,
+    page_files,
+    remove_cache_dir,
+    remove_orphan_locks,
+    save_cache_stats,
+    write_manifest,
+)
+
+# Top-level directories written by the pre-v2 cache layout (<root>/<pdf hash>/)
+_LEGACY_DIR_RE = re.compile(r"[0-9a-f]{64}(\.tmp)?")
+
+
+def format_bytes(n):
+    """Format a byte count as a short human-readable string."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def iter_tmp_dirs(cache_root):
+    """Yield the `.tmp` staging directories left in the cache."""
+    yield from (cache_root / f"v{CACHE_VERSION}").glob("*/*.tmp")
+
+
+def cache_stats(cache_root):
+    """Print per-deck sizes, page counts, hit/miss counts, and totals."""
+    stats = load_cache_stats(cache_root)
+    total_bytes = total_hits = total_misses = count = 0
+
+    print(f"📦 Cache: {cache_root.resolve()}\n")
+    for pdf_cache_dir, manifest in iter_cache_dirs(cache_root):
+        key = cache_dir_key(cache_root, pdf_cache_dir)
+        counts = stats.get(key, {})
+        size = cache_dir_size(manifest)
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        last_used = datetime.datetime.fromtimestamp(cache_dir_last_used(pdf_cache_dir))
+
+        print(f"{key[:12]}…/{pdf_cache_dir.name}  {counts.get('filename', '?')}")
+        print(f"    {len(manifest['pages'])}/{manifest['page_count']} pages, {format_bytes(size)}, "
+              f"{hits} hits / {misses} misses, last used {last_used:%Y-%m-%d %H:%M}")
+
+        count += 1
+        total_bytes += size
+        total_hits += hits
+        total_misses += misses
+
+    lookups = total_hits + total_misses
+    hit_rate = f" ({100 * total_hits / lookups:.0f}% hit rate)" if lookups else ""
+    print(f"\n{count} cached deck variant(s), {format_bytes(total_bytes)}, "
+          f"{total_hits} hits / {total_misses} misses{hit_rate}")
+
+    segments = [path for path in iter_segments(cache_root) if ".partial." not in path.name]
+    if segments:
+        print(f"{len(segments)} encoded video segment(s), "
+              f"{format_bytes(sum(path.stat().st_size for path in segments))}")
+
+    stale = list(iter_tmp_dirs(cache_root))
+    if stale:
+        print(f"⚠️ {len(stale)} leftover .tmp directories (run 'videoslides cache gc')")
+
+
+def cache_gc(cache_root, max_bytes, max_age):
+    """Remove leftovers and enforce the size/age budget."""
+    removed = 0
+
+    # Staging directories from interrupted runs: one whose lock nobody holds
+    # isn't being rendered into
+    for tmp_dir in iter_tmp_dirs(cache_root):
+        with cache_lock(tmp_dir.with_suffix(""), blocking=False) as locked:
+            if locked:
+                print(f"🧹 Removing abandoned {tmp_dir.relative_to(cache_root)}")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                removed += 1
+
+    # Directories from older cache layouts
+    for path in cache_root.iterdir():
+        legacy = _LEGACY_DIR_RE.fullmatch(path.name) or (
+            re.fullmatch(r"v\d+", path.name) and path.name != f"v{CACHE_VERSION}")
+        if legacy and path.is_dir():
+            print(f"🧹 Removing old cache layout directory {path.name}")
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+
+    # Partial segments from interrupted encodes (the budget below covers the rest)
+    for path in iter_segments(cache_root):
+        if ".partial." in path.name:
+            print(f"🧹 Removing partial segment {path.name}")
+            path.unlink(missing_ok=True)
+            removed += 1
+
+    # Hash index entries for PDFs that no longer exist
+    index_path = cache_root / HASH_INDEX_NAME
+    if index_path.exists():
+        with open(index_path, "rb") as f:
+            index = json.load(f)
+        live = {path: entry for path, entry in index.items() if os.path.exists(path)}
+        if len(live) != len(index):
+            print(f"🧹 Dropping {len(index) - len(live)} hash index entries for missing PDFs")
+            tmp_path = index_path.with_name(index_path.name + ".tmp")
+            tmp_path.write_text(json.dumps(live, indent=1), encoding="utf-8")
+            os.replace(tmp_path, index_path)
+
+    # Counters for directories that are gone
+    stats = load_cache_stats(cache_root)
+    keys = {cache_dir_key(cache_root, d) for d, _ in iter_cache_dirs(cache_root)}
+    if set(stats) - keys:
+        save_cache_stats(cache_root, {k: v for k, v in stats.items() if k in keys})
+
+    for path, size in evict_cache(cache_root, max_bytes, max_age):
+        print(f"🧹 Evicted {cache_entry_name(cache_root, path)} ({format_bytes(size)})")
+        removed += 1
+
+    # Lock files outlive their directories, which another process may still be locking
+    orphans = remove_orphan_locks(cache_root)
+    if orphans:
+        print(f"🧹 Removed {orphans} lock file(s) of deleted cache directories")
+        removed += orphans
+
+    print(f"✅ Garbage collection done, {removed} item(s) removed")
+
+
+def page_problem(pdf_cache_dir, entry):
+    """Check a cached page's files against its manifest entry; returns what's wrong, or None."""
+    for f in page_files(entry):
+        try:
+            data = (pdf_cache_dir / f["file"]).read_bytes()
+        except FileNotFoundError:
+            return f"{f['file']} missing"
+        if len(data) != f["size"]:
+            return f"{f['file']} size {len(data)} != {f['size']}"
+        if hashlib.sha256(data).hexdigest() != f["sha256"]:
+            return f"{f['file']} checksum mismatch"
+    return None
+
+
+def cache_verify(cache_root, repair):
+    """Check every cached page against its manifest size and checksum."""
+    bad_total = 0
+    for pdf_cache_dir, manifest in iter_cache_dirs(cache_root):
+        bad = []
+        for page, entry in manifest["pages"].items():
+            problem = page_problem(pdf_cache_dir, entry)
+            if problem:
+                bad.append((page, problem))
+
+        key = cache_dir_key(cache_root, pdf_cache_dir)
+        if not bad:
+            print(f"✅ {key}: {len(manifest['pages'])} pages OK")
+            continue
+
+        bad_total += len(bad)
+        for page, reason in bad:
+            print(f"❌ {key}: page {page}: {reason}")
+        if repair:
+            # Drop broken pages from the manifest so they are re-rendered on
+            # next use. A render may have updated the directory since it was
+            # checked, so the manifest is re-read and the pages re-checked
+            # under its lock.
+            with cache_lock(pdf_cache_dir):
+                manifest = load_manifest(pdf_cache_dir)
+                if manifest is None:
+                    continue
+                dropped = 0
+                for page, _ in bad:
+                    entry = manifest["pages"].get(page)
+                    if entry is None or not page_problem(pdf_cache_dir, entry):
+                        continue
+                    for f in page_files(manifest["pages"].pop(page)):
+                        (pdf_cache_dir / f["file"]).unlink(missing_ok=True)
+                    dropped += 1
+                if dropped:
+                    write_manifest(pdf_cache_dir, manifest)
+            print(f"🔧 {key}: dropped {dropped} broken page(s)")
+
+    if bad_total and not repair:
+        print(f"\n⚠️ {bad_total} broken page(s); run 'videoslides cache verify --repair' to drop them")
+    return bad_total == 0
+
+
+def cache_purge(cache_root):
+    """Delete every cached image and the cache bookkeeping files."""
+    for pdf_cache_dir, _ in list(iter_cache_dirs(cache_root)):
+        remove_cache_dir(cache_root, pdf_cache_dir)
+    for path in cache_root.iterdir():
+        if (path.name in (HASH_INDEX_NAME, STATS_NAME, SEGMENTS_NAME) or re.fullmatch(r"v\d+", path.name)
+                or _LEGACY_DIR_RE.fullmatch(path.name)):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+    print(f"✅ Purged cache at {cache_root.resolve()}")
+
+
+def main(argv=None):
+    """Run a `videoslides cache` subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="videoslides cache", description="Inspect and maintain the slide image cache"
+    )
+    parser.add_argument("command", choices=["stats", "gc", "verify", "purge"])
+    parser.add_argument("directory", nargs="?", default=".",
+                        help="Directory containing the config (default: current directory)")
+    parser.add_argument("--config", "-c", default="config.toml",
+                        help="Config file to read cache settings from (default: config.toml)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Cache root to operate on (default: from config)")
+    parser.add_argument("--max-size-mb", type=float, default=None,
+                        help="gc: evict least recently used decks above this size")
+    parser.add_argument("--max-age-days", type=float, default=None,
+                        help="gc: evict decks unused for this many days")
+    parser.add_argument("--repair", action="store_true",
+                        help="verify: drop broken pages so they are re-rendered")
+    parser.add_argument("--yes", "-y", action="store_true",
+                        help="purge: don't ask for confirmation")
+
+    args = parser.parse_args(argv)
+
+    config_path = Path(args.directory) / args.config
+    config = load_config(config_path) if config_path.exists() else {"settings": {}}
+    config.setdefault("settings", {})
+    cache_root = Path(args.cache_dir) if args.cache_dir else get_cache_root(config)
+
+    if not cache_root.exists():
+        print(f"No cache at {cache_root}")
+        return
+
+    if args.command == "stats":
+        cache_stats(cache_root)
+    elif args.command == "gc":
+        max_bytes, max_age = get_cache_budget(config)
+        if args.max_size_mb is not None:
+            max_bytes = args.max_size_mb * 1024 * 1024
+        if args.max_age_days is not None:
+            max_age = args.max_age_days * 86400
+        cache_gc(cache_root, max_bytes, max_age)
+    elif args.command == "verify":
+        if not cache_verify(cache_root, args.repair):
+            raise SystemExit(1)
+    elif args.command == "purge":
+        if not args.yes and input(f"Delete everything in {cache_root.resolve()}? [y/N] ").lower() != "y":
+            return
+        cache_purge(cache_root)
@@ -8,13 +8,67 @@
 # ]
 # ///
 
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 import argparse
+import hashlib
+import json
+import math
 import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import fitz
 import numpy as np
-from moviepy import ImageClip, concatenate_videoclips, CompositeVideoClip, VideoClip
+from moviepy import concatenate_videoclips, VideoClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
 
-from shared import load_config, prepare_slide_images, resolve_slides
+import slidecache
+from shared import (
+    ENCODER_PROFILES,
+    SEGMENTS_NAME,
+    enforce_cache_budget,
+    get_cache_root,
+    get_render_params,
+    get_render_workers,
+    get_workers,
+    load_config,
+    load_image_samples,
+    format_duration,
+    parse_color,
+    prepare_slide_images,
+    read_ppm_header,
+    render_page,
+    render_page_samples,
+    resolve_slides,
+)
+
+# Frames the streaming renderer may hold ahead of the encoder, per worker
+STREAM_LOOKAHEAD = 2
+
+# Bump whenever a change to encode_segment() alters the segments it produces
+SEGMENT_VERSION = 3
+
+# Info bar drawn over video frames: the presenter's font sizes at 1080p, and
+# the opacity of its black background
+FONT_SIZE_INFO = 24
+FONT_SIZE_COUNTDOWN = 36
+INFO_BAR_ALPHA = 140
+
+# Composited info bar strips kept in memory. A countdown needs a new strip
+# every second, so a few cover every frame until it changes.
+OVERLAY_STRIP_CACHE_SIZE = 8
+
+# Seconds each slide of the synthetic `bench --profiles` deck is shown
+BENCH_SLIDE_SECONDS = 10
+
+# Frame rate and x264 preset of --draft previews
+DRAFT_FPS = 2
+DRAFT_PRESET = "ultrafast"
 
 
 def _parse_color_to_rgb(color_str):
@@ -31,109 +85,1447 @@ def _parse_color_to_rgb(color_str):
     return (255, 255, 255)
 
 
-def create_progress_bar_clip(width, height, duration, progress_color="white", bar_height=10):
-    """Create a progress bar clip that fills from left to right over the duration."""
+# The one decoded slide image the moviepy backend holds: (path, owner, frame)
+_slide_frame_slot = [None, None, None]
+
+
+def load_slide_frame(path, resolution, owner=None):
+    """Decode a cached slide image, keeping only the most recent one in memory.
+
+    Raw PPM frames are memory-mapped instead of decoded. With an `owner`
+    (any object identifying the caller, such as its clip), a private copy is
+    returned that the caller may draw into; a different owner asking for the
+    same image gets a fresh copy, not one already drawn into.
+    """
+    if _slide_frame_slot[0] != path or _slide_frame_slot[1] is not owner:
+        # Release the previous slide before decoding the next
+        _slide_frame_slot[:] = [None, None, None]
+        width, height = resolution
+        if path.suffix == ".ppm":
+            _, _, offset = read_ppm_header(path)
+            frame = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(height, width, 3))
+        else:
+            frame = np.frombuffer(load_image_samples(path), dtype=np.uint8).reshape(height, width, 3)
+        _slide_frame_slot[:] = [path, owner, frame if owner is None else np.array(frame)]
+    return _slide_frame_slot[2]
+
+
+def _lazy_clip(frame_function, duration, resolution):
+    """Create a clip of known size without evaluating its first frame."""
+    clip = VideoClip(duration=duration)
+    clip.frame_function = frame_function
+    clip.size = tuple(resolution)
+    return clip
+
+
+def create_slide_clip(path, duration, resolution):
+    """Create a clip showing a cached slide image, decoded only once encoding reaches it."""
+    return _lazy_clip(lambda t: load_slide_frame(path, resolution), duration, resolution)
+
+
+def create_progress_bar_slide(path, duration, resolution, progress_color="white", bar_height=10):
+    """Create a slide clip whose progress bar fills from left to right over the duration.
+
+    The bar is drawn into the bar rows of one writable copy of the slide
+    frame, so no full frame is allocated or composited per video frame. The
+    image is decoded only once encoding reaches the slide.
+    """
+    width, height = resolution
     rgb = _parse_color_to_rgb(progress_color)
+    top = height - bar_height - 20
+    bar_rows = []
 
     def make_frame(t):
-        progress = min(t / duration, 1.0)
-        progress_width = int(width * progress)
+        buffer = load_slide_frame(path, resolution, owner=bar_rows)
+        if not bar_rows:
+            bar_rows.append(buffer[top:top + bar_height].copy())
+        # The epsilon keeps frame times like 2.4 from truncating a pixel short
+        progress_width = int(width * min(t / duration, 1.0) + 1e-6)
+        buffer[top:top + bar_height, :progress_width] = rgb
+        buffer[top:top + bar_height, progress_width:] = bar_rows[0][:, progress_width:]
+        return buffer
+
+    return _lazy_clip(make_frame, duration, resolution)
+
+
+# Rasterized text coverage masks, keyed by (text, font size): countdown
+# characters and whole info bar labels
+_glyph_atlas = {}
+
+
+def _rasterize_text(text, font_size):
+    """Rasterize `text` in white-on-black Helvetica with PyMuPDF; returns a coverage mask."""
+    width = max(math.ceil(fitz.get_text_length(text, fontname="helv", fontsize=font_size)), 1)
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=math.ceil(font_size * 1.25))
+    page.insert_text((0, round(font_size * 0.95)), text, fontname="helv", fontsize=font_size)
+    pix = page.get_pixmap(colorspace=fitz.csGRAY)
+    doc.close()
+    return 255 - np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+
+
+def text_mask(text, font_size, glyphs=False):
+    """Return the coverage mask of `text` from the glyph atlas, rasterizing it on first use.
+
+    With `glyphs`, the text is assembled from per-character masks instead,
+    so countdowns that change every second reuse the same few digits.
+    """
+    if not glyphs:
+        key = (text, font_size)
+        if key not in _glyph_atlas:
+            _glyph_atlas[key] = _rasterize_text(text, font_size)
+        return _glyph_atlas[key]
+    return np.hstack([text_mask(char, font_size) for char in text])
+
+
+def slide_overlay(config, entry):
+    """Return the info bar of a timeline entry as (label, countdown), or None.
+
+    The label is the title, plus the page number with `show_page_number`;
+    it is shown on every slide with the `info_bar` setting. `countdown` is
+    whether the remaining time is shown, as `show_countdown` does in the
+    presenter.
+    """
+    slide = entry["slide"]
+    parts = []
+    if config["settings"].get("info_bar", False) or slide.get("show_page_number", False):
+        if entry["title"]:
+            parts.append(entry["title"])
+        if slide.get("show_page_number", False):
+            parts.append(f"{entry['page']}/{entry['total_pages']}")
+    countdown = slide.get("show_countdown", False)
+    if not parts and not countdown:
+        return None
+    return "   ".join(parts) or None, countdown
+
+
+def countdown_text(duration, t):
+    """The countdown shown `t` seconds into a slide of `duration` seconds."""
+    return format_duration(max(1, math.ceil(duration - t - 1e-6)))
+
+
+def countdown_pieces(duration):
+    """Split a slide into [(countdown text, seconds)] spans of constant countdown."""
+    edges = [0] + [duration - k for k in range(math.ceil(duration) - 1, 0, -1)] + [duration]
+    return [(countdown_text(duration, start), end - start) for start, end in zip(edges, edges[1:])]
+
+
+def strip_rows(resolution):
+    """Height of the info bar strips, even so ffmpeg can overlay them on 4:2:0 frames exactly."""
+    scale = resolution[1] / 1080
+    rows = math.ceil(round(FONT_SIZE_COUNTDOWN * scale) * 1.25) + 2 * round(8 * scale)
+    return rows + rows % 2
+
+
+# Most recently composited info bar strips, keyed by (width, height, label,
+# countdown text); see OVERLAY_STRIP_CACHE_SIZE
+_overlay_strips = OrderedDict()
+
+
+def overlay_strip(resolution, label, countdown=None):
+    """Composite the info bar for the bottom of a frame from the glyph atlas.
+
+    Returns (top, color, alpha): the strip's first row, its premultiplied
+    RGB and its opacity, both covering the rows from `top` to the bottom of
+    the frame. Every strip is as tall as a countdown bar so ffmpeg can
+    overlay them at one position; the info bar alone is shorter. With
+    neither a label nor a countdown, the strip is fully transparent.
+    """
+    key = (*resolution, label, countdown)
+    if key in _overlay_strips:
+        _overlay_strips.move_to_end(key)
+        return _overlay_strips[key]
+
+    width, height = resolution
+    scale = height / 1080
+    info_size, countdown_size = round(FONT_SIZE_INFO * scale), round(FONT_SIZE_COUNTDOWN * scale)
+    pad, shadow = round(8 * scale), max(1, round(scale))
+    strip_height = strip_rows(resolution)
+    bar_height = strip_height if countdown else math.ceil(info_size * 1.25) + 2 * pad
+
+    # Coverage of the white text and its black drop shadow
+    text = np.zeros((strip_height, width), dtype=np.uint16)
+    texts = []
+    if label:
+        mask = text_mask(label, info_size)
+        texts.append((mask, round(16 * scale)))
+    if countdown:
+        mask = text_mask(countdown, countdown_size, glyphs=True)
+        texts.append((mask, (width - mask.shape[1]) // 2))
+    shade = np.zeros_like(text)
+    for mask, x in texts:
+        y = strip_height - bar_height + (bar_height - mask.shape[0]) // 2
+        h, w = mask.shape[0], min(mask.shape[1], width - x - shadow)
+        np.maximum(text[y:y + h, x:x + w], mask[:, :w], out=text[y:y + h, x:x + w])
+        np.maximum(shade[y + shadow:y + shadow + h, x + shadow:x + shadow + w], mask[:, :w],
+                   out=shade[y + shadow:y + shadow + h, x + shadow:x + shadow + w])
+
+    # Background, shadow and text composited with "over" in premultiplied form
+    alpha = np.zeros_like(text)
+    if label or countdown:
+        alpha[strip_height - bar_height:] = INFO_BAR_ALPHA
+    alpha = shade + alpha * (255 - shade) // 255
+    alpha = text + alpha * (255 - text) // 255
+    color = np.repeat(text[..., None], 3, axis=2).astype(np.uint8)
+    strip = (height - strip_height, color, alpha.astype(np.uint8))
+    _overlay_strips[key] = strip
+    if len(_overlay_strips) > OVERLAY_STRIP_CACHE_SIZE:
+        _overlay_strips.popitem(last=False)
+    return strip
+
+
+def draw_overlay(frame, strip):
+    """Blend an overlay_strip() into the bottom rows of a frame, in place."""
+    top, color, alpha = strip
+    rows = frame[top:]
+    rows[:] = color + (rows * (255 - alpha[..., None]).astype(np.uint16) // 255).astype(np.uint8)
+
+
+def write_overlay_image(path, strip):
+    """Save an overlay_strip() as an RGBA PNG for ffmpeg's overlay filter."""
+    _, color, alpha = strip
+    # PNG stores straight alpha
+    straight = color.astype(np.uint16) * 255 // np.maximum(alpha, 1)[..., None]
+    samples = np.dstack([straight.astype(np.uint8), alpha])
+    height, width = alpha.shape
+    fitz.Pixmap(fitz.csRGB, width, height, np.ascontiguousarray(samples).tobytes(), 1).save(path)
+
+
+def overlay_items(config, entries, resolution, directory):
+    """Write the info bar images of consecutive timeline entries for ffmpeg.
+
+    Returns [(image_path, duration)] covering the entries, for a concat
+    playlist overlaid on the slides, or None if no entry has an info bar.
+    Each distinct strip is written once; slides without one get a
+    transparent strip.
+    """
+    overlays = [slide_overlay(config, entry) for entry in entries]
+    if not any(overlays):
+        return None
+
+    def image(label, countdown):
+        key = hashlib.sha256(json.dumps([*resolution, label, countdown]).encode()).hexdigest()[:16]
+        path = Path(directory) / f"overlay-{key}.png"
+        if not path.exists():
+            write_overlay_image(path, overlay_strip(resolution, label, countdown))
+        return path
+
+    items = []
+    for entry, overlay in zip(entries, overlays):
+        if overlay is None:
+            items.append((image(None, None), entry["duration"]))
+        elif not overlay[1]:
+            items.append((image(overlay[0], None), entry["duration"]))
+        else:
+            items += [(image(overlay[0], text), seconds) for text, seconds in countdown_pieces(entry["duration"])]
+    return items
+
+
+def draw_slide_bottom(frame, saved, t, duration, bar, overlay_at):
+    """Redraw a slide's bottom rows from `saved`: progress bar, then info bar.
+
+    `bar` is (color, height) or None; `overlay_at(t)` returns the
+    overlay_strip() at `t` or None.
+    """
+    height, width = frame.shape[:2]
+    frame[height - len(saved):] = saved
+    if bar:
+        rgb, bar_height = bar
+        top = height - bar_height - 20
+        frame[top:top + bar_height, :int(width * min(t / duration, 1.0) + 1e-6)] = rgb
+    strip = overlay_at(t)
+    if strip is not None:
+        draw_overlay(frame, strip)
+
+
+def overlay_function(config, entry, resolution):
+    """Return `overlay_at(t)` for a timeline entry, or None if it has no info bar."""
+    overlay = slide_overlay(config, entry)
+    if overlay is None:
+        return None
+    label, countdown = overlay
+    if not countdown:
+        return lambda t: overlay_strip(resolution, label)
+    return lambda t: overlay_strip(resolution, label, countdown_text(entry["duration"], t))
+
+
+def bottom_rows(resolution, bar_height):
+    """Number of bottom rows draw_slide_bottom() may change."""
+    return min(resolution[1], max(strip_rows(resolution), bar_height + 20 if bar_height else 0))
+
+
+def create_overlay_slide(path, duration, resolution, overlay_at, bar=None):
+    """Create a slide clip with the info bar (and progress bar, if `bar`) drawn in.
+
+    Like create_progress_bar_slide(), only the bottom rows of one writable
+    copy of the slide frame are redrawn per video frame, from a strip
+    composited once per countdown value.
+    """
+    rows = bottom_rows(resolution, bar[1] if bar else 0)
+    saved = []
+
+    def make_frame(t):
+        buffer = load_slide_frame(path, resolution, owner=saved)
+        if not saved:
+            saved.append(buffer[-rows:].copy())
+        draw_slide_bottom(buffer, saved[0], t, duration, bar, overlay_at)
+        return buffer
+
+    return _lazy_clip(make_frame, duration, resolution)
+
+
+def progress_bar_filter(width, height, fps, bars, prefilter="null", postfilter=None, overlay=None):
+    """Build a filter_complex graph drawing progress bars over input 0.
+
+    `bars` lists (start, duration, color, bar_height) in seconds of output
+    time. Each bar is a solid color source overlaid at the bottom of the
+    frame and slid in from the left, so ffmpeg only touches the bar rows;
+    the overlay ends with the slides since the color source never does.
+    `prefilter` is applied to the input first and `postfilter` to the
+    frames with their bars. `overlay` names an input of info bar images
+    (see overlay_items()) laid over the bottom of the frames after the
+    bars. The graph's output is labelled [out].
+    """
+    # Half a frame of slack keeps each bar to its own slide's frames; the
+    # epsilon keeps frame times like 2.4 from truncating a pixel short
+    slack = 0.5 / fps
+    graph = [f"[0:v]{prefilter}[v0]"]
+    for i, (start, duration, color, bar_height) in enumerate(bars):
+        r, g, b = _parse_color_to_rgb(color)
+        top = height - bar_height - 20
+        graph.append(f"color=c=0x{r:02x}{g:02x}{b:02x}:s={width}x{bar_height}:r={fps}[bar{i}]")
+        graph.append(
+            f"[v{i}][bar{i}]overlay=x='trunc(W*min((t-{start})/{duration},1)+1e-6)-W':y={top}:eval=frame:shortest=1"
+            f":enable='between(t,{start - slack},{start + duration - slack})'[v{i + 1}]"
+        )
+    last = f"v{len(bars)}"
+    if overlay:
+        graph.append(f"[{last}][{overlay}]overlay=x=0:y=main_h-overlay_h:eof_action=pass[info]")
+        last = "info"
+    graph.append(f"[{last}]{postfilter + ',' if postfilter else ''}format=yuv420p[out]")
+    return ";".join(graph)
+
+
+def encoder_params(fps, keyframe_seconds, vfr=False, keyframes=None):
+    """Build the ffmpeg parameters forcing a fixed keyframe interval.
+
+    With `vfr`, frames are spaced unevenly, so keyframes are forced by
+    timestamp instead of by frame count. `keyframes` lists extra times
+    (see keyframe_times()) to force keyframes at, such as slide starts, or
+    is the path of a file listing them (see write_keyframe_times()).
+    """
+    if isinstance(keyframes, Path):
+        # ffmpeg reads the option's value from the file
+        params = ['-/force_key_frames', str(keyframes)]
+    elif keyframes:
+        params = ['-force_key_frames', ",".join(f"{t:.6f}" for t in keyframes)]
+    elif vfr:
+        params = ['-force_key_frames', f'expr:gte(t,n_forced*{keyframe_seconds})']
+    else:
+        params = []
+    params += ['-sc_threshold', '0']
+    if vfr:
+        # No B-frames, so trailing frames can be cut without breaking references
+        return ['-fps_mode', 'vfr', *params, '-bf', '0']
+    keyframe_interval = fps * keyframe_seconds
+    return ['-g', str(keyframe_interval), '-keyint_min', str(keyframe_interval), *params]
+
+
+def vfr_frame_durations(duration, fps, keyframe_seconds, progress_bar=False, countdown=False):
+    """Split a slide into the frames variable-frame-rate output needs.
+
+    A static slide gets one frame per keyframe interval, so players can
+    still seek within it; a slide with a progress bar gets a frame every
+    1/fps seconds to animate the bar, and one with a countdown also a frame
+    whenever the countdown changes, once a second (see countdown_pieces()).
+    """
+    if progress_bar:
+        n_frames = max(round(duration * fps), 1)
+        return [duration / n_frames] * n_frames
+    starts = {keyframe_seconds * k for k in range(max(math.ceil(duration / keyframe_seconds), 1))}
+    if countdown:
+        starts.update(round(duration - k, 6) for k in range(1, math.ceil(duration)))
+    starts = sorted(starts)
+    return [end - start for start, end in zip(starts, starts[1:] + [duration])]
+
+
+def output_target(output_filename, output_format="file"):
+    """Return (path, ffmpeg output options) for writing `output_filename`.
+
+    "file" writes `output_filename` as is. "hls" and "dash" write a playlist
+    and fragmented MP4 segments into a directory named after
+    `output_filename`; segments are cut at every keyframe, so each slide
+    starts a new segment. Nothing is created until prepare_output().
+    """
+    if output_format == "file":
+        return output_filename, []
+
+    out_dir = Path(output_filename).with_suffix("")
+    # A tiny target duration makes the muxer cut at every keyframe
+    if output_format == "hls":
+        return str(out_dir / "index.m3u8"), [
+            "-f", "hls", "-hls_time", "0.001", "-hls_playlist_type", "vod",
+            "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", "init.mp4",
+            "-hls_segment_filename", str(out_dir / "segment_%05d.m4s"),
+        ]
+    return str(out_dir / "manifest.mpd"), [
+        "-f", "dash", "-seg_duration", "0.001", "-use_template", "1", "-use_timeline", "1",
+        "-init_seg_name", "init.m4s", "-media_seg_name", "segment_$Number%05d$.m4s",
+    ]
+
+
+def prepare_output(target):
+    """Get a target's output location ready for ffmpeg to write to.
+
+    HLS and DASH outputs get their directory created, emptied of the
+    segments of an earlier render, which a shorter one wouldn't overwrite.
+    """
+    if target["output_format"] == "file":
+        return
+    out_dir = Path(target["path"]).parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for stale in out_dir.glob("segment_*.m4s"):
+        stale.unlink()
+
+
+def output_targets(config):
+    """Return every configured output as a dict of "path", "muxer_args",
+    "output_format", "resolution", "codec", "codec_params" and
+    "encoder_preset".
+
+    `output_video` is one filename or a list of filenames and tables
+    overriding the resolution, codec or encoder profile, preset and format
+    of that output.
+    """
+    settings = config["settings"]
+    outputs = settings.get("output_video", "presentation.mkv")
+    targets = []
+    destinations = set()
+    for output in outputs if isinstance(outputs, list) else [outputs]:
+        if isinstance(output, str):
+            output = {"path": output}
+        output_format = output.get("output_format", settings.get("output_format", "file"))
+        if "codec" in output:
+            codec, codec_params = output["codec"], []
+        else:
+            profile = ENCODER_PROFILES[output.get("encoder_profile", settings.get("encoder_profile", "x264"))]
+            codec, codec_params = profile["codec"], profile["params"]
+        if codec == "ffv1" and (output_format != "file" or Path(output["path"]).suffix.lower() != ".mkv"):
+            raise RuntimeError(f"Output '{output['path']}': ffv1 needs an .mkv file (output_format = \"file\")")
+        # HLS/DASH outputs are written into a directory named after the file
+        destination = Path(output["path"]) if output_format == "file" else Path(output["path"]).with_suffix("")
+        if destination.resolve() in destinations:
+            raise RuntimeError(f"Two outputs would both write '{destination}'")
+        destinations.add(destination.resolve())
+        path, muxer_args = output_target(output["path"], output_format)
+        targets.append({
+            "path": path,
+            "muxer_args": muxer_args,
+            "output_format": output_format,
+            "resolution": output.get("resolution", settings.get("resolution", [1920, 1080])),
+            "codec": codec,
+            "codec_params": codec_params,
+            "encoder_preset": output.get("encoder_preset", settings.get("encoder_preset", "medium")),
+        })
+    return targets
+
+
+def target_codec_params(target):
+    """ffmpeg options selecting and tuning the encoder of an output target."""
+    return ["-c:v", target["codec"], "-preset", target["encoder_preset"], "-pix_fmt", "yuv420p",
+            *target["codec_params"]]
+
+
+def scale_filter(config, target):
+    """Filter scaling frames at the configured resolution to a target's, or None.
+
+    Frames are letterboxed with the background color if the aspect ratios
+    differ.
+    """
+    width, height = target["resolution"]
+    if [width, height] == list(config["settings"].get("resolution", [1920, 1080])):
+        return None
+    background = get_render_params(config)["background"]
+    return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:-1:-1:color=0x{background}")
+
+
+def fan_out_filter(config, targets, label="out"):
+    """Extend a filter graph ending in [label] to one output per target.
+
+    Returns (graph suffix, output labels): the composited frames are split
+    once and scaled per target, so every encoder shares the decode and
+    compositing work.
+    """
+    if len(targets) == 1 and scale_filter(config, targets[0]) is None:
+        return "", [f"[{label}]"]
+    graph = []
+    if len(targets) > 1:
+        graph.append(f"[{label}]split={len(targets)}" + "".join(f"[{label}{i}]" for i in range(len(targets))))
+    labels = []
+    for i, target in enumerate(targets):
+        source = f"[{label}{i}]" if len(targets) > 1 else f"[{label}]"
+        scale = scale_filter(config, target)
+        if scale is None:
+            labels.append(source)
+        else:
+            graph.append(f"{source}{scale}[{label}{i}s]")
+            labels.append(f"[{label}{i}s]")
+    return "".join(";" + part for part in graph), labels
+
+
+def open_writers(config, targets, fps, params):
+    """Open an FFMPEG_VideoWriter per target for frames at the configured resolution.
+
+    `params` are the encoder options shared by every target. Each writer is
+    its own ffmpeg process, so the targets encode concurrently.
+    """
+    resolution = config["settings"].get("resolution", [1920, 1080])
+    writers = []
+    for target in targets:
+        prepare_output(target)
+        scale = scale_filter(config, target)
+        writers.append(FFMPEG_VideoWriter(
+            target["path"], resolution, fps, codec=target["codec"], preset=target["encoder_preset"],
+            ffmpeg_params=["-pix_fmt", "yuv420p", *target["codec_params"], *(["-vf", scale] if scale else []),
+                           *params, *target["muxer_args"]],
+        ))
+    return writers
+
+
+def describe_targets(targets):
+    """Short summary of the output containers, e.g. "MP4 + MKV"."""
+    return " + ".join(Path(target["path"]).suffix.lstrip(".").upper() for target in targets)
+
+
+def run_ffmpeg(args):
+    """Run ffmpeg with the given arguments, raising RuntimeError on failure."""
+    result = subprocess.run([FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", *args],
+                            stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()}")
+
+
+def build_timeline(config, include_uncached=False):
+    """List every page in play order.
+
+    Each entry is a dict with the slide config ("slide"), "page" number and
+    the PDF's "total_pages", the "title" (carried forward from earlier
+    slides like in the presenter), cached "image" path, its "sha256" from
+    the cache manifest, the smaller cached "levels" ({level: {"image",
+    "sha256"}}), the "duration" in seconds, and its "start" time. With
+    `include_uncached`, pages missing from the cache are listed with an
+    image and sha256 of None.
+
+    The timeline is built once per run; previews take a slice of it (see
+    slice_timeline()).
+    """
+    timeline = []
+    start = 0
+    title = None
+    for slide, pdf_cache_dir, total_pages, pages in resolve_slides(config, include_uncached):
+        duration = slide.get("duration", 15) or 15
+        title = slide.get("title", title)
+        for page_num, cached_png, levels, entry in pages:
+            timeline.append({
+                "slide": slide,
+                "page": page_num,
+                "total_pages": total_pages,
+                "title": title,
+                "image": cached_png,
+                "sha256": entry["sha256"] if entry else None,
+                "levels": {level: {"image": path, "sha256": entry["levels"][level]["sha256"]}
+                           for level, path in levels.items()},
+                "duration": duration,
+                "start": start,
+            })
+            start += duration
+    return timeline
+
+
+def parse_timestamp(text):
+    """Parse "90", "1:30", "1:02:03" or "90s" as seconds; None if it isn't a time."""
+    match = re.fullmatch(r"(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d+)?)s?", text.strip())
+    if not match or (":" not in text and not text.strip().endswith("s")):
+        return None
+    parts = [float(p) for p in match.groups() if p is not None]
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+def find_timeline_position(timeline, spec, end=False):
+    """Return the timeline index a --from/--to `spec` refers to.
+
+    `spec` is a 1-based slide page index ("12"), a timestamp ("1:30" or
+    "90s"), or a slide title (case-insensitive). For `end`, titles resolve
+    to the last page of the titled slide, and the returned index is
+    exclusive.
+    """
+    if spec.isdigit():
+        index = int(spec)
+        if not 1 <= index <= len(timeline):
+            raise RuntimeError(f"Slide {index} is out of range (1-{len(timeline)})")
+        return index if end else index - 1
+
+    seconds = parse_timestamp(spec)
+    if seconds is not None:
+        for i, entry in enumerate(timeline):
+            if seconds < entry["start"] + entry["duration"]:
+                # A slide partly before `seconds` is still shown
+                return i + 1 if end else i
+        return len(timeline)
+
+    matches = [i for i, entry in enumerate(timeline)
+               if (entry["slide"].get("title") or "").lower() == spec.lower()]
+    if not matches:
+        raise RuntimeError(f"No slide titled '{spec}'")
+    return matches[-1] + 1 if end else matches[0]
+
+
+def slice_timeline(timeline, start=None, end=None):
+    """Return the part of the timeline between --from `start` and --to `end`.
+
+    Whole slide pages are kept; start times are shifted so the slice begins
+    at 0.
+    """
+    first = find_timeline_position(timeline, start) if start else 0
+    last = find_timeline_position(timeline, end, end=True) if end else len(timeline)
+    selected = timeline[first:last]
+    if not selected:
+        raise RuntimeError("--from/--to select no slides")
+    offset = selected[0]["start"]
+    return [{**entry, "start": entry["start"] - offset} for entry in selected]
+
+
+def draft(config, timeline):
+    """Apply the --draft profile to a config and its timeline.
+
+    Drafts encode the half-size cached images when every page has one and
+    the half resolution is even (as x264 needs), at most DRAFT_FPS, with the
+    fastest x264 preset. Returns the new (config, timeline).
+    """
+    settings = dict(config["settings"])
+    width, height = settings.get("resolution", [1920, 1080])
+    settings["fps"] = min(settings.get("fps", 5), DRAFT_FPS)
+    settings["encoder_preset"] = DRAFT_PRESET
+    if (width // 2) % 2 or (height // 2) % 2:
+        print(f"ℹ️ Half of {width}x{height} isn't even, drafting at full resolution")
+    elif not all("half" in entry["levels"] for entry in timeline):
+        print("ℹ️ Not every page has a half-size image cached, drafting at full resolution")
+    else:
+        settings["resolution"] = [width // 2, height // 2]
+        timeline = [{**entry, **entry["levels"]["half"]} for entry in timeline]
+        if isinstance(settings.get("output_video"), list):
+            settings["output_video"] = [
+                {**output, "resolution": [size // 2 // 2 * 2 for size in output["resolution"]]}
+                if isinstance(output, dict) and "resolution" in output else output
+                for output in settings["output_video"]
+            ]
+    print(f"📝 Draft: {settings['resolution'][0]}x{settings['resolution'][1]} at {settings['fps']} fps")
+    return {**config, "settings": settings}, timeline
+
+
+def preview_filename(output_filename):
+    """Name of the preview output written instead of `output_filename`."""
+    path = Path(output_filename)
+    return str(path.with_name(f"{path.stem}.preview{path.suffix}"))
+
+
+def preview_outputs(outputs):
+    """The output_video setting with every output renamed by preview_filename()."""
+    if not isinstance(outputs, list):
+        return preview_filename(outputs)
+    return [preview_filename(output) if isinstance(output, str)
+            else {**output, "path": preview_filename(output["path"])}
+            for output in outputs]
+
+
+def keyframe_times(timeline, keyframe_seconds=None):
+    """Return the times to force keyframes at: every slide start, and with
+    `keyframe_seconds`, every `keyframe_seconds` within the slide.
+
+    At constant frame rate, -g already keeps keyframes at most
+    `keyframe_seconds` apart, so only slide starts are forced and the list
+    stays short however long the video is.
+    """
+    times = []
+    for entry in timeline:
+        offset = 0
+        while offset < entry["duration"]:
+            times.append(entry["start"] + offset)
+            if keyframe_seconds is None:
+                break
+            offset += keyframe_seconds
+    return times
+
+
+def write_keyframe_times(path, times):
+    """Write keyframe times for encoder_params() to hand ffmpeg as a file.
+
+    A list with a keyframe every `keyframe_interval` grows with the video,
+    so for long videos it would be too long for a command line argument.
+    """
+    Path(path).write_text(",".join(f"{t:.6f}" for t in times), encoding="utf-8")
+    return Path(path)
+
 
-        if progress_width == 0:
-            return np.zeros((bar_height, 1, 3), dtype=np.uint8)
+def slide_chapters(timeline):
+    """Return (start, end, title) chapters, one per [[slides]] entry.
 
-        frame = np.empty((bar_height, progress_width, 3), dtype=np.uint8)
-        frame[:, :] = rgb
-        return frame
+    Chapters are named after the slide's `title`, or its PDF and first page
+    when it has none.
+    """
+    chapters = []
+    for entry in timeline:
+        end = entry["start"] + entry["duration"]
+        if chapters and entry["slide"] is chapters[-1][3]:
+            chapters[-1][1] = end
+            continue
+        slide = entry["slide"]
+        title = slide.get("title") or f"{Path(slide['filename']).stem} p{entry['page']}"
+        chapters.append([entry["start"], end, title, slide])
+    return [(start, end, title) for start, end, title, _ in chapters]
 
-    return VideoClip(make_frame, duration=duration)
 
+def write_ffmetadata(path, chapters):
+    """Write chapters to an ffmetadata file for ffmpeg's -map_chapters."""
+    def escape(text):
+        return re.sub(r"([=;#\\\n])", r"\\\1", text)
 
-def pngs_to_video(config):
-    """Convert PNG images to video (MP4 or MKV)."""
-    output_filename = config["settings"].get("output_video", "presentation.mkv")
+    lines = [";FFMETADATA1"]
+    for start, end, title in chapters:
+        lines += ["[CHAPTER]", "TIMEBASE=1/1000", f"START={round(start * 1000)}",
+                  f"END={round(end * 1000)}", f"title={escape(title)}"]
+    Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def add_chapters(output_filename, chapters):
+    """Add chapters to an encoded video by remuxing it without re-encoding."""
+    output = Path(output_filename)
+    remuxed = output.with_name(f"{output.stem}.chapters{output.suffix}")
+    with tempfile.TemporaryDirectory(prefix="videoslides-") as tmp:
+        metadata = Path(tmp) / "chapters.ffmeta"
+        write_ffmetadata(metadata, chapters)
+        try:
+            run_ffmpeg(["-i", str(output), "-i", str(metadata), "-map", "0",
+                        "-map_chapters", "1", "-c", "copy", str(remuxed)])
+            os.replace(remuxed, output)
+        finally:
+            remuxed.unlink(missing_ok=True)
+
+
+def write_seek_index(output_filename, timeline):
+    """Write <output>.index.json mapping each slide page to its start time and keyframe.
+
+    Only keyframes are decoded to find them, so this is fast even for long
+    videos. `keyframe_time` is the first keyframe at or after the slide
+    start, which a player can seek to without decoding earlier frames.
+    """
+    result = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-skip_frame", "nokey", "-i", str(output_filename),
+         "-vf", "showinfo", "-f", "null", "-"],
+        stdin=subprocess.DEVNULL, capture_output=True, text=True,
+    )
+    keyframes = [float(t) for t in re.findall(r"pts_time:(\S+)", result.stderr)]
+
+    slides = []
+    for index, entry in enumerate(timeline, 1):
+        slides.append({
+            "index": index,
+            "filename": entry["slide"]["filename"],
+            "page": entry["page"],
+            "title": entry["slide"].get("title"),
+            "start": entry["start"],
+            "end": entry["start"] + entry["duration"],
+            "keyframe_time": next((t for t in keyframes if t >= entry["start"] - 1e-3), None),
+        })
+
+    index_path = Path(output_filename).with_name(Path(output_filename).name + ".index.json")
+    index_path.write_text(json.dumps({"video": Path(output_filename).name, "slides": slides}, indent=2),
+                          encoding="utf-8")
+    print(f"🧭 Seek index saved as '{index_path}'")
+
+
+def finish_video(config, target, timeline, chapters_written=False):
+    """Add slide chapters (unless the encoder already wrote them) and the seek index."""
+    if target["output_format"] != "file":
+        # HLS/DASH playlists already index the slide-aligned segments
+        if config["settings"].get("seek_index", False):
+            print("ℹ️ Skipping chapters and seek index for segmented output; use the playlist instead")
+        return
+    if not chapters_written:
+        add_chapters(target["path"], slide_chapters(timeline))
+    if config["settings"].get("seek_index", False):
+        write_seek_index(target["path"], timeline)
+
+
+def _ffconcat_path(path):
+    """Quote a path for an ffconcat playlist line."""
+    return "'" + str(Path(path).resolve()).replace("'", "'\\''") + "'"
+
+
+def write_ffconcat(path, items):
+    """Write an ffconcat playlist showing each (image_path, duration) in turn."""
+    lines = ["ffconcat version 1.0"]
+    for image_path, duration in items:
+        lines += [f"file {_ffconcat_path(image_path)}", f"duration {duration:.6f}"]
+    # The demuxer ignores the last entry's duration unless the file is repeated
+    lines.append(f"file {_ffconcat_path(items[-1][0])}")
+    Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def concat_to_video(config, timeline=None):
+    """Encode cached slide images with ffmpeg's concat demuxer.
+
+    Each distinct slide image is handed to ffmpeg once with its duration,
+    so encode time scales with the number of slides rather than with
+    duration × fps. Progress bars are drawn by an ffmpeg overlay. With the
+    `vfr` setting, frames are only emitted where vfr_frame_durations()
+    needs them instead of at a constant fps. Every output target is encoded
+    by the same ffmpeg run from one decode of the slides.
+    """
+    targets = output_targets(config)
+
+    fps = config["settings"].get("fps", 5)
+    keyframe_seconds = config["settings"].get("keyframe_interval", 15)
+    width, height = config["settings"].get("resolution", [1920, 1080])
+    vfr = config["settings"].get("vfr", False)
+
+    if timeline is None:
+        timeline = build_timeline(config)
+    if not timeline:
+        print("⚠️ No valid PNG images found")
+        return
+
+    print(f"🎥 Starting image → {describe_targets(targets)} concat encode of {len(timeline)} slides...")
+
+    items = []
+    bars = []
+    for entry in timeline:
+        slide = entry["slide"]
+        show_progress_bar = slide.get("show_progress_bar", False)
+        if show_progress_bar:
+            bars.append((entry["start"], entry["duration"], slide.get("progress_bar_color", "#1f4305"),
+                         slide.get("progress_bar_height", 16)))
+        if vfr:
+            items += [(entry["image"], d) for d in
+                      vfr_frame_durations(entry["duration"], fps, keyframe_seconds, show_progress_bar,
+                                          slide.get("show_countdown", False))]
+        else:
+            items.append((entry["image"], entry["duration"]))
+
+    with tempfile.TemporaryDirectory(prefix="videoslides-") as tmp:
+        playlist = Path(tmp) / "slides.ffconcat"
+        write_ffconcat(playlist, items)
+        metadata = Path(tmp) / "chapters.ffmeta"
+        write_ffmetadata(metadata, slide_chapters(timeline))
+        overlay_args = []
+        overlays = overlay_items(config, timeline, (width, height), tmp)
+        if overlays:
+            overlay_playlist = Path(tmp) / "overlay.ffconcat"
+            write_ffconcat(overlay_playlist, overlays)
+            overlay_args = ["-f", "concat", "-safe", "0", "-i", str(overlay_playlist)]
+        fan_out, labels = fan_out_filter(config, targets)
+        for target in targets:
+            prepare_output(target)
+        if vfr:
+            # -g counts frames, so every keyframe time is listed
+            keyframes = write_keyframe_times(Path(tmp) / "keyframes.txt",
+                                             keyframe_times(timeline, keyframe_seconds))
+        else:
+            keyframes = keyframe_times(timeline)
+        params = encoder_params(fps, keyframe_seconds, vfr, keyframes)
+        outputs = []
+        for target, label in zip(targets, labels):
+            outputs += ["-map", label, "-map_chapters", "1", *target_codec_params(target),
+                        *params, *target["muxer_args"], target["path"]]
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", str(playlist), "-i", str(metadata), *overlay_args,
+            "-filter_complex", progress_bar_filter(width, height, fps, bars,
+                                                   prefilter="null" if vfr else f"fps={fps}",
+                                                   overlay="2:v" if overlays else None) + fan_out,
+            *outputs,
+        ])
+
+    for target in targets:
+        print(f"✅ Video saved as '{target['path']}'")
+        finish_video(config, target, timeline, chapters_written=True)
+
+
+def segment_key(entry, fps, resolution, codec_params, postfilter=None, overlay=None):
+    """Hash everything that determines the encoded segment of a timeline entry."""
+    slide = entry["slide"]
+    progress_bar = None
+    if slide.get("show_progress_bar", False):
+        progress_bar = [slide.get("progress_bar_color", "#1f4305"), slide.get("progress_bar_height", 16)]
+    key = {
+        "version": SEGMENT_VERSION,
+        "image": entry["sha256"],
+        "duration": entry["duration"],
+        "fps": fps,
+        "resolution": list(resolution),
+        "progress_bar": progress_bar,
+        "codec": codec_params,
+    }
+    if postfilter:
+        key["scale"] = postfilter
+    if overlay:
+        key["overlay"] = list(overlay)
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def segment_codec_params(target, fps, keyframe_seconds, vfr=False):
+    """Encoder options shared by every segment of a target, so they can be stream-copied together."""
+    return [*target_codec_params(target), *encoder_params(fps, keyframe_seconds, vfr)]
+
+
+def segment_suffix(target):
+    """Container of a target's segments: MP4, or Matroska for codecs MP4 can't hold."""
+    return ".mkv" if target["codec"] == "ffv1" else ".mp4"
+
+
+def encode_segment(segment_path, image_path, slide, duration, fps, resolution, codec_params,
+                   frame_durations=None, postfilter=None, overlays=None):
+    """Encode one slide page to a standalone video segment.
+
+    Segments start on a keyframe, so they can be joined losslessly. The
+    still image is looped by ffmpeg, which also draws the progress bar; with
+    `frame_durations` (variable frame rate), it is shown once per listed
+    duration instead. `postfilter` scales the frames for output targets at
+    another resolution, and `overlays` are the segment's info bar images
+    from overlay_items(). The segment is written under a temporary name and
+    renamed into place when complete.
+    """
+    partial = segment_path.with_name(f"{segment_path.stem}-{os.getpid()}.partial{segment_path.suffix}")
+    bars = []
+    if slide.get("show_progress_bar", False):
+        bars.append((0, duration, slide.get("progress_bar_color", "#1f4305"),
+                     slide.get("progress_bar_height", 16)))
+    filter_args = ["-filter_complex", progress_bar_filter(*resolution, fps, bars, postfilter=postfilter,
+                                                          overlay="1:v" if overlays else None),
+                   "-map", "[out]"]
+    try:
+        with tempfile.TemporaryDirectory(prefix="videoslides-") as tmp:
+            overlay_args = []
+            if overlays:
+                overlay_playlist = Path(tmp) / "overlay.ffconcat"
+                write_ffconcat(overlay_playlist, overlays)
+                overlay_args = ["-f", "concat", "-safe", "0", "-i", str(overlay_playlist)]
+            if frame_durations is None:
+                n_frames = max(round(duration * fps), 1)
+                run_ffmpeg([
+                    "-loop", "1", "-framerate", str(fps), "-i", str(image_path), *overlay_args,
+                    *filter_args, "-frames:v", str(n_frames), *codec_params, str(partial),
+                ])
+            else:
+                playlist = Path(tmp) / "segment.ffconcat"
+                write_ffconcat(playlist, [(image_path, d) for d in frame_durations])
+                run_ffmpeg([
+                    "-f", "concat", "-safe", "0", "-i", str(playlist), *overlay_args,
+                    *filter_args, *codec_params, str(partial),
+                ])
+        os.replace(partial, segment_path)
+    finally:
+        partial.unlink(missing_ok=True)
+
+
+def get_encode_workers(config, jobs=None):
+    """Return the number of segment encoder processes to use (see get_workers())."""
+    return get_workers(config, "encode_workers", jobs)
+
+
+def encode_segments(jobs, fps, resolution, codec_params, workers=1, vfr=False, keyframe_seconds=None,
+                    postfilter=None):
+    """Encode {segment_path: timeline_entry} jobs, `workers` at a time.
+
+    Slide boundaries are keyframes, so segments are independent and can be
+    encoded in any order by separate ffmpeg processes. With `vfr`, segments
+    get the frames from vfr_frame_durations(). Entries may carry the
+    "overlays" images of their info bar.
+    """
+    def describe(entry):
+        return f"'{entry['slide']['filename']}' page {entry['page']} ({entry['duration']}s)"
+
+    def args(segment_path, entry):
+        frame_durations = None
+        if vfr:
+            slide = entry["slide"]
+            frame_durations = vfr_frame_durations(entry["duration"], fps, keyframe_seconds,
+                                                  slide.get("show_progress_bar", False),
+                                                  slide.get("show_countdown", False))
+        return (segment_path, entry["image"], entry["slide"], entry["duration"],
+                fps, resolution, codec_params, frame_durations, postfilter, entry.get("overlays"))
+
+    if workers <= 1 or len(jobs) <= 1:
+        for segment_path, entry in jobs.items():
+            print(f"🎞️ Encoding segment for {describe(entry)}")
+            encode_segment(*args(segment_path, entry))
+        return
+
+    print(f"⚡ Encoding {len(jobs)} segments with {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(encode_segment, *args(segment_path, entry)): entry
+                   for segment_path, entry in jobs.items()}
+        for future in as_completed(futures):
+            future.result()
+            print(f"🎞️ Encoded segment for {describe(futures[future])}")
+
+
+def segments_to_video(config, workers=1, timeline=None):
+    """Encode each slide page to a cached segment and stream-copy them together.
+
+    Segments are keyed by image content, duration, fps, resolution,
+    progress bar and codec settings, so editing one slide re-encodes only
+    the segments it affects. Missing segments are encoded by `workers`
+    processes. Each output target has its own segments. Returns the set of
+    segment paths used.
+    """
+    targets = output_targets(config)
 
     fps = config["settings"].get("fps", 5)
     keyframe_seconds = config["settings"].get("keyframe_interval", 15)
     resolution = config["settings"].get("resolution", [1920, 1080])
+    vfr = config["settings"].get("vfr", False)
 
-    output_ext = Path(output_filename).suffix.lstrip(".").upper()
-    print(f"🎥 Starting PNG → {output_ext} conversion...")
+    if timeline is None:
+        timeline = build_timeline(config)
+    if not timeline:
+        print("⚠️ No valid PNG images found")
+        return set()
 
-    clips = []
-    for slide, pdf_cache_dir, total_pages, page_numbers in resolve_slides(config):
-        duration = slide.get("duration", 15) or 15
+    print(f"🎥 Starting segment → {describe_targets(targets)} encode of {len(timeline)} slides...")
+
+    segments_dir = get_cache_root(config) / SEGMENTS_NAME
+    segments_dir.mkdir(parents=True, exist_ok=True)
+
+    used = set()
+    with tempfile.TemporaryDirectory(prefix="videoslides-") as tmp:
+        metadata = Path(tmp) / "chapters.ffmeta"
+        write_ffmetadata(metadata, slide_chapters(timeline))
+
+        for target in targets:
+            codec_params = segment_codec_params(target, fps, keyframe_seconds, vfr)
+            postfilter = scale_filter(config, target)
+
+            segments = []
+            missing = {}
+            reused = 0
+            for entry in timeline:
+                overlay = slide_overlay(config, entry)
+                key = segment_key(entry, fps, target["resolution"], codec_params, postfilter, overlay)
+                segment_path = segments_dir / f"{key}{segment_suffix(target)}"
+                if segment_path.exists():
+                    os.utime(segment_path)
+                    reused += 1
+                elif segment_path not in missing:
+                    # Identical slides share one segment
+                    missing[segment_path] = {**entry, "overlays": overlay_items(config, [entry], resolution, tmp)}
+                segments.append(segment_path)
+
+            if reused:
+                print(f"♻️ Reused {reused}/{len(segments)} cached segments for '{target['path']}'")
+            encode_segments(missing, fps, resolution, codec_params, workers, vfr, keyframe_seconds, postfilter)
+
+            playlist = Path(tmp) / "segments.ffconcat"
+            lines = ["ffconcat version 1.0"]
+            for path, entry in zip(segments, timeline):
+                lines.append(f"file {_ffconcat_path(path)}")
+                # VFR segments end with a frame marking their end; all but the last one is cut
+                if vfr and path is not segments[-1]:
+                    lines.append(f"outpoint {entry['duration']:.6f}")
+            playlist.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            prepare_output(target)
+            run_ffmpeg(["-f", "concat", "-safe", "0", "-i", str(playlist), "-i", str(metadata),
+                        "-map", "0", "-map_chapters", "1", "-c", "copy", *target["muxer_args"], target["path"]])
+
+            print(f"✅ Video saved as '{target['path']}'")
+            finish_video(config, target, timeline, chapters_written=True)
+            used.update(segments)
+    return used
+
+
+def bench_segments(config, worker_counts):
+    """Time a full segment encode of the deck at each worker count.
+
+    Segments are written to a scratch directory, so the segment cache is
+    neither used nor filled. Prints wall-clock time and speedup over the
+    first worker count.
+    """
+    fps = config["settings"].get("fps", 5)
+    keyframe_seconds = config["settings"].get("keyframe_interval", 15)
+    resolution = config["settings"].get("resolution", [1920, 1080])
+    vfr = config["settings"].get("vfr", False)
+    target = output_targets(config)[0]
+    codec_params = segment_codec_params(target, fps, keyframe_seconds, vfr)
 
-        print(f"🎬 Processing '{slide['filename']}' (duration={duration}s, pages={page_numbers})...")
+    timeline = build_timeline(config)
+    total_seconds = sum(entry["duration"] for entry in timeline)
+    print(f"⏱️ Benchmarking segment encoding: {len(timeline)} slides, {total_seconds}s of video, "
+          f"{os.cpu_count()} CPU cores\n")
+
+    results = []
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory(prefix="videoslides-bench-") as tmp:
+            jobs = {}
+            for entry in timeline:
+                key = segment_key(entry, fps, resolution, codec_params)
+                jobs.setdefault(Path(tmp) / f"{key}{segment_suffix(target)}", entry)
+            start = time.perf_counter()
+            encode_segments(jobs, fps, resolution, codec_params, workers, vfr, keyframe_seconds)
+            results.append((workers, time.perf_counter() - start))
+
+    print(f"\n{'workers':>8} {'seconds':>9} {'speedup':>8} {'video s/s':>10}")
+    baseline = results[0][1]
+    for workers, elapsed in results:
+        print(f"{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x {total_seconds / elapsed:>10.1f}")
+
+
+def synthetic_deck(pdf_path, pages):
+    """Write a 16:9 PDF of `pages` typical slides: text, a bar chart, and a gradient photo stand-in."""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=960, height=540)
+        page.insert_text((60, 90), f"Synthetic slide {i + 1}", fontsize=40, color=(0.1, 0.2, 0.4))
+        for line in range(5):
+            page.insert_text((80, 160 + 40 * line), f"• Point {line + 1}: slides are mostly flat color and text",
+                             fontsize=20)
+        if i % 3 == 1:
+            for bar in range(6):
+                height = 40 + 37 * ((bar * 7 + i) % 6)
+                page.draw_rect(fitz.Rect(620 + 50 * bar, 480 - height, 660 + 50 * bar, 480),
+                               color=None, fill=(0.2, 0.4 + 0.1 * bar, 0.7))
+        elif i % 3 == 2:
+            # Smooth color fields are the hardest part of a slide to encode
+            for y in range(0, 270, 6):
+                for x in range(0, 320, 8):
+                    page.draw_rect(fitz.Rect(600 + x, 200 + y, 608 + x, 206 + y), color=None,
+                                   fill=(x / 320, y / 270, 0.5 + 0.5 * ((x + y) % 64) / 64))
+    doc.save(pdf_path)
+    doc.close()
+
+
+def bench_profiles(config, profiles, pages):
+    """Encode a synthetic deck with each encoder profile and compare.
+
+    Prints encode speed, output size, and PSNR against a lossless (ffv1)
+    encode of the same frames, at the configured resolution, fps and
+    encoder_preset.
+    """
+    fps = config["settings"].get("fps", 5)
+    keyframe_seconds = config["settings"].get("keyframe_interval", 15)
+    width, height = config["settings"].get("resolution", [1920, 1080])
+    preset = config["settings"].get("encoder_preset", "medium")
+    bg_rgb = parse_color("#" + get_render_params(config)["background"])
+    n_frames = pages * BENCH_SLIDE_SECONDS * fps
+    print(f"⏱️ Benchmarking encoder profiles: {pages} synthetic slides, {width}x{height}, "
+          f"{pages * BENCH_SLIDE_SECONDS}s at {fps} fps ({n_frames} frames), preset {preset}\n")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="videoslides-bench-") as tmp:
+        pdf_path = Path(tmp) / "deck.pdf"
+        synthetic_deck(pdf_path, pages)
+        items = []
+        with fitz.open(pdf_path) as doc:
+            for i, page in enumerate(doc):
+                image_path = Path(tmp) / f"{i + 1:03d}.png"
+                render_page(page, width, height, bg_rgb).save(image_path)
+                items.append((image_path, BENCH_SLIDE_SECONDS))
+        playlist = Path(tmp) / "deck.ffconcat"
+        write_ffconcat(playlist, items)
+        # The last slide counts down with a progress bar, the only motion in a talk
+        bars = [((pages - 1) * BENCH_SLIDE_SECONDS, BENCH_SLIDE_SECONDS, "#1f4305", 16)]
+        source = ["-f", "concat", "-safe", "0", "-i", str(playlist),
+                  "-filter_complex", progress_bar_filter(width, height, fps, bars, prefilter=f"fps={fps}"),
+                  "-map", "[out]", "-frames:v", str(n_frames)]
+
+        reference = Path(tmp) / "reference.mkv"
+        run_ffmpeg([*source, "-c:v", "ffv1", str(reference)])
+
+        for name in profiles:
+            profile = ENCODER_PROFILES[name]
+            target = {"codec": profile["codec"], "codec_params": profile["params"], "encoder_preset": preset}
+            output = Path(tmp) / f"{name}.{'webm' if profile['codec'] == 'libvpx-vp9' else 'mp4'}"
+            print(f"🎞️ Encoding with '{name}'...")
+            start = time.perf_counter()
+            run_ffmpeg([*source, *target_codec_params(target), *encoder_params(fps, keyframe_seconds),
+                        str(output)])
+            elapsed = time.perf_counter() - start
+
+            result = subprocess.run(
+                [FFMPEG_BINARY, "-hide_banner", "-i", str(output), "-i", str(reference),
+                 "-lavfi", "[0:v][1:v]psnr", "-f", "null", "-"],
+                capture_output=True, text=True,
+            )
+            match = re.search(r"PSNR .* average:(\S+)", result.stderr)
+            psnr = float(match.group(1)) if match else math.nan
+            results.append((name, n_frames / elapsed, output.stat().st_size, psnr))
+
+    print(f"\n{'profile':<12} {'fps':>8} {'size':>10} {'PSNR dB':>8}")
+    for name, encode_fps, size, psnr in results:
+        print(f"{name:<12} {encode_fps:>8.1f} {slidecache.format_bytes(size):>10} {psnr:>8.2f}")
+
+
+def bench_main(argv=None):
+    """Run `videoslides bench`: compare segment worker counts, or encoder profiles."""
+    parser = argparse.ArgumentParser(
+        prog="videoslides bench", description="Benchmark parallel segment encoding or encoder profiles"
+    )
+    parser.add_argument("directory", nargs="?", default=".",
+                        help="Directory to run in (default: current directory)")
+    parser.add_argument("--config", "-c", default="config.toml",
+                        help="Config file to use (default: config.toml)")
+    parser.add_argument("--workers", "-w", default="1,2,4,8,16,32",
+                        help="Comma-separated encoder worker counts to time (default: 1,2,4,8,16,32)")
+    parser.add_argument("--profiles", "-p", nargs="?", const=",".join(ENCODER_PROFILES), default=None,
+                        help="Instead, encode a synthetic deck with these comma-separated encoder profiles "
+                             "(default: all) and compare speed, size and PSNR")
+    parser.add_argument("--slides", type=int, default=6,
+                        help="--profiles: number of synthetic slides (default: 6)")
+
+    args = parser.parse_args(argv)
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    original_dir = os.getcwd()
+    os.chdir(args.directory)
+    try:
+        if args.profiles is not None:
+            profiles = args.profiles.split(",")
+            for name in profiles:
+                if name not in ENCODER_PROFILES:
+                    raise RuntimeError(f"Unknown encoder profile '{name}' ({', '.join(ENCODER_PROFILES)})")
+            # Resolution, fps and preset come from the config if there is one
+            config = load_config(args.config) if Path(args.config).exists() else {"settings": {}}
+            bench_profiles(config, profiles, args.slides)
+            return
+        config = load_config(args.config)
+        prepare_slide_images(config)
+        bench_segments(config, worker_counts)
+    finally:
+        os.chdir(original_dir)
+
+
+def pngs_to_video(config, timeline=None):
+    """Convert PNG images to video (MP4 or MKV).
+
+    Frames are composited once and piped to one encoder per output target.
+    """
+    targets = output_targets(config)
+
+    fps = config["settings"].get("fps", 5)
+    keyframe_seconds = config["settings"].get("keyframe_interval", 15)
+    resolution = config["settings"].get("resolution", [1920, 1080])
+
+    print(f"🎥 Starting PNG → {describe_targets(targets)} conversion...")
+    if config["settings"].get("vfr", False):
+        print("ℹ️ vfr needs video_backend = \"concat\" or \"segments\", encoding at constant frame rate")
+
+    if timeline is None:
+        timeline = build_timeline(config)
+    clips = []
+    slide = None
+    for entry in timeline:
+        page_num, cached_png, duration = entry["page"], entry["image"], entry["duration"]
+        if entry["slide"] is not slide:
+            slide = entry["slide"]
+            pages = [e["page"] for e in timeline if e["slide"] is slide]
+            print(f"🎬 Processing '{slide['filename']}' (duration={duration}s, pages={pages})...")
 
         # Check if this slide should have a progress bar
         show_progress_bar = slide.get("show_progress_bar", False)
         progress_bar_color = slide.get("progress_bar_color", "#1f4305")
         progress_bar_height = slide.get("progress_bar_height", 16)
 
-        for page_num in page_numbers:
-            cached_png = pdf_cache_dir / f"{page_num:03d}.png"
+        print(f"🎞️ Adding page {page_num} ({duration}s)")
+        # For long slides, note that keyframes will be added during encoding
+        if duration > keyframe_seconds:
+            keyframe_count = duration // keyframe_seconds + 1
+            print(f"🔑 Long slide detected - will add ~{keyframe_count} keyframes during encoding")
+
+        overlay_at = overlay_function(config, entry, resolution)
+        if overlay_at is not None:
+            # Info bar and countdown are blitted from strips composited once
+            bar = (_parse_color_to_rgb(progress_bar_color), progress_bar_height) if show_progress_bar else None
+            clip = create_overlay_slide(cached_png, duration, resolution, overlay_at, bar)
+        # Add progress bar to this clip if requested
+        elif show_progress_bar:
+            print(f"🎯 Adding progress bar to page {page_num}...")
+
+            # Draw the bar into the slide frame rather than compositing a separate clip
+            clip = create_progress_bar_slide(
+                cached_png,
+                duration=duration,
+                resolution=resolution,
+                progress_color=progress_bar_color,
+                bar_height=progress_bar_height
+            )
+        else:
+            clip = create_slide_clip(cached_png, duration, resolution)
+
+        clips.append(clip)
 
-            if not cached_png.exists():
-                print(f"⚠️ Page {page_num} not found in cache for '{slide['filename']}', skipping")
-                continue
+    if clips:
+        print(f"🔧 Creating video with {len(clips)} slides...")
+        # Every clip is full-frame, so chaining them needs no compositing
+        final = concatenate_videoclips(clips, method="chain")
 
-            print(f"🎞️ Adding page {page_num} ({duration}s)")
-            clip = ImageClip(str(cached_png)).with_duration(duration)
+        writers = open_writers(config, targets, fps,
+                               encoder_params(fps, keyframe_seconds,
+                                              keyframes=keyframe_times(timeline)))
+        try:
+            for frame in final.iter_frames(fps=fps, dtype="uint8", logger="bar"):
+                for writer in writers:
+                    writer.write_frame(frame)
+        finally:
+            for writer in writers:
+                writer.close()
+
+        for target in targets:
+            print(f"✅ Video saved as '{target['path']}'")
+            finish_video(config, target, timeline)
+    else:
+        print("⚠️ No valid PNG images found")
 
-            # For long slides, note that keyframes will be added during encoding
-            if duration > keyframe_seconds:
-                keyframe_count = duration // keyframe_seconds + 1
-                print(f"🔑 Long slide detected - will add ~{keyframe_count} keyframes during encoding")
 
-            # Add progress bar to this clip if requested
-            if show_progress_bar:
-                print(f"🎯 Adding progress bar to page {page_num}...")
+def iter_stream_frames(config, timeline, workers=1):
+    """Yield (timeline_entry, frame) for every timeline entry, in order.
 
-                # Create progress bar for this clip
-                progress_bar = create_progress_bar_clip(
-                    width=resolution[0],
-                    height=resolution[1],
-                    duration=duration,
-                    progress_color=progress_bar_color,
-                    bar_height=progress_bar_height
-                )
+    Pages already in the image cache are decoded from it; the rest are
+    rendered straight from the PDF without writing the cache. Frames are
+    produced by `workers` processes (a background thread for 1) running at
+    most STREAM_LOOKAHEAD frames per worker ahead of the consumer, so
+    rendering overlaps with encoding while memory stays bounded.
+    """
+    width, height = config["settings"].get("resolution", [1920, 1080])
+    bg_rgb = parse_color("#" + get_render_params(config)["background"])
+    lookahead = STREAM_LOOKAHEAD * workers
 
-                # Position progress bar at bottom left of screen
-                progress_bar = progress_bar.with_position((0, resolution[1] - progress_bar_height - 20))
+    def frame(job):
+        entry, future = job
+        samples = future.result()
+        return entry, np.frombuffer(samples, dtype=np.uint8).reshape(height, width, 3)
 
-                # Composite slide with progress bar
-                clip = CompositeVideoClip([clip, progress_bar])
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(1)
+    with executor:
+        pending = deque()
+        for entry in timeline:
+            if entry["image"] is not None:
+                future = executor.submit(load_image_samples, entry["image"])
+            else:
+                future = executor.submit(render_page_samples, str(Path(entry["slide"]["filename"]).resolve()),
+                                         entry["page"] - 1, width, height, bg_rgb)
+            pending.append((entry, future))
+            if len(pending) > lookahead:
+                yield frame(pending.popleft())
+        while pending:
+            yield frame(pending.popleft())
 
-            clips.append(clip)
 
-    if clips:
-        print(f"🔧 Creating video with {len(clips)} slides...")
-        final = concatenate_videoclips(clips, method="compose")
+def write_slide_frames(writers, frame, slide, duration, fps, resolution, overlay_at=None):
+    """Write the frames of one slide page to every writer, drawing its progress bar if enabled.
 
-        # Set codec and keyframe interval based on format
-        keyframe_interval = fps * keyframe_seconds
+    `overlay_at(t)` gives the info bar to draw, see overlay_function().
+    """
+    n_frames = max(round(duration * fps), 1)
+    if overlay_at is not None:
+        bar = None
+        if slide.get("show_progress_bar", False):
+            bar = (_parse_color_to_rgb(slide.get("progress_bar_color", "#1f4305")),
+                   slide.get("progress_bar_height", 16))
+        frame = frame.copy()
+        saved = frame[-bottom_rows(resolution, bar[1] if bar else 0):].copy()
+        for i in range(n_frames):
+            draw_slide_bottom(frame, saved, i / fps, duration, bar, overlay_at)
+            for writer in writers:
+                writer.write_frame(frame)
+        return
+    if not slide.get("show_progress_bar", False):
+        for _ in range(n_frames):
+            for writer in writers:
+                writer.write_frame(frame)
+        return
 
-        final.write_videofile(
-            output_filename,
-            fps=fps,
-            threads=None,
-            codec='libx264',
-            ffmpeg_params=['-g', str(keyframe_interval), '-keyint_min', str(keyframe_interval), '-sc_threshold', '0']
-        )
+    # The bar only grows, so draw each frame's bar over the last
+    rgb = _parse_color_to_rgb(slide.get("progress_bar_color", "#1f4305"))
+    bar_height = slide.get("progress_bar_height", 16)
+    top = resolution[1] - bar_height - 20
+    frame = frame.copy()
+    for i in range(n_frames):
+        progress_width = int(resolution[0] * min(i / fps / duration, 1.0) + 1e-6)
+        frame[top:top + bar_height, :progress_width] = rgb
+        for writer in writers:
+            writer.write_frame(frame)
 
-        print(f"✅ Video saved as '{output_filename}'")
+
+def stream_to_video(config, workers=1, timeline=None):
+    """Render PDF pages straight into the encoder as raw frames.
+
+    Skips the PNG round-trip of pdfs_to_pngs() + pngs_to_video() for one-off
+    renders: pages are letterboxed in memory and piped to ffmpeg, reusing
+    cached images where they already exist.
+    """
+    targets = output_targets(config)
+
+    fps = config["settings"].get("fps", 5)
+    keyframe_seconds = config["settings"].get("keyframe_interval", 15)
+    resolution = config["settings"].get("resolution", [1920, 1080])
+
+    print(f"🎥 Streaming PDF → {describe_targets(targets)} conversion...")
+    if config["settings"].get("vfr", False):
+        print("ℹ️ vfr is not supported with --stream, encoding at constant frame rate")
+
+    if timeline is None:
+        timeline = build_timeline(config, include_uncached=True)
+    count = 0
+    writers = open_writers(config, targets, fps,
+                           encoder_params(fps, keyframe_seconds, keyframes=keyframe_times(timeline)))
+    try:
+        for entry, frame in iter_stream_frames(config, timeline, workers):
+            slide, duration = entry["slide"], entry["duration"]
+            print(f"🎞️ Streaming '{slide['filename']}' page {entry['page']} ({duration}s)")
+            write_slide_frames(writers, frame, slide, duration, fps, resolution,
+                               overlay_function(config, entry, resolution))
+            count += 1
+    finally:
+        for writer in writers:
+            writer.close()
+
+    if count:
+        for target in targets:
+            print(f"✅ Video saved as '{target['path']}' ({count} slides)")
+            finish_video(config, target, timeline)
     else:
-        print("⚠️ No valid PNG images found")
+        print("⚠️ No valid slides found")
 
 
 def main():
     """Run the complete pipeline: PDFs → PNGs → Video."""
+    # `videoslides cache ...` manages the shared image cache instead
+    if sys.argv[1:2] == ["cache"]:
+        slidecache.main(sys.argv[2:])
+        return
+    # `videoslides bench ...` times parallel segment encoding
+    if sys.argv[1:2] == ["bench"]:
+        bench_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description="Convert PDF presentations to video using TOML config")
     parser.add_argument("directory", nargs="?", default=".",
                        help="Directory to run in (default: current directory)")
     parser.add_argument("--config", "-c", default="config.toml",
                        help="Config file to use (default: config.toml)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                       help="Render and segment encoder processes (default: render_workers and "
+                            "encode_workers settings, 0 = all cores)")
+    parser.add_argument("--stream", action="store_true",
+                       help="Render pages straight into the encoder without filling the image cache")
+    parser.add_argument("--from", dest="start", default=None,
+                       help="Preview from this slide: 1-based page index, timestamp (1:30, 90s) or title")
+    parser.add_argument("--to", dest="end", default=None,
+                       help="Preview up to and including this slide (same forms as --from)")
+    parser.add_argument("--draft", action="store_true",
+                       help=f"Fast preview: half resolution, at most {DRAFT_FPS} fps, {DRAFT_PRESET} x264 preset")
 
     args = parser.parse_args()
 
@@ -148,11 +1540,40 @@ def main():
         config = load_config(args.config)
         print(f"📋 Loaded config from '{args.config}'\n")
 
-        # Stage 1: Convert PDFs to PNGs using config
-        prepare_slide_images(config)
+        if args.start or args.end or args.draft:
+            # Previews never overwrite the real render
+            config["settings"]["output_video"] = preview_outputs(
+                config["settings"].get("output_video", "presentation.mkv"))
+
+        used = set()
+        if not args.stream:
+            # Stage 1: Convert PDFs to PNGs using config; the cache budget
+            # is enforced once the segments the output reuses are known
+            used = prepare_slide_images(config, jobs=args.jobs, evict=False)
+
+        # Build the timeline once; previews encode a slice of it
+        timeline = build_timeline(config, include_uncached=args.stream)
+        if args.start or args.end:
+            timeline = slice_timeline(timeline, args.start, args.end)
+            print(f"✂️ Previewing {len(timeline)} slide page(s), "
+                  f"{sum(entry['duration'] for entry in timeline)}s")
+        if args.draft:
+            config, timeline = draft(config, timeline)
 
-        # Stage 2: Convert PNGs to video
-        pngs_to_video(config)
+        if args.stream:
+            # Single stage: PDFs → raw frames → video, reusing cached images
+            stream_to_video(config, workers=get_render_workers(config, args.jobs), timeline=timeline)
+        else:
+            # Stage 2: Convert PNGs to video
+            video_backend = config["settings"].get("video_backend", "moviepy")
+            if video_backend == "concat":
+                concat_to_video(config, timeline)
+            elif video_backend == "segments":
+                used |= segments_to_video(config, workers=get_encode_workers(config, args.jobs),
+                                          timeline=timeline)
+            else:
+                pngs_to_video(config, timeline)
+            enforce_cache_budget(config, used)
 
         print("\n🎬 VideoSlides pipeline complete!")
 
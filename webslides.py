@@ -12,10 +12,10 @@
 import argparse
 import json
 import os
-import shutil
 from pathlib import Path
 
 from shared import (
+    convert_to_png,
     prepare_slide_images,
     load_config,
     resolve_slides,
@@ -26,7 +26,7 @@ def build_slide_list(config):
     """Build an ordered list of slide metadata from config, referencing cached PNGs."""
     slides = []
     prev_title = None
-    for slide_cfg, pdf_cache_dir, total_pages, page_numbers in resolve_slides(config):
+    for slide_cfg, pdf_cache_dir, total_pages, pages in resolve_slides(config):
         until = slide_cfg.get("until", None)
         duration = slide_cfg.get("duration", None)
         if until:
@@ -41,22 +41,21 @@ def build_slide_list(config):
         show_page_number = slide_cfg.get("show_page_number", False)
         show_countdown = slide_cfg.get("show_countdown", False)
 
-        for page_num in page_numbers:
-            cached_png = pdf_cache_dir / f"{page_num:03d}.png"
-            if cached_png.exists():
-                slides.append({
-                    "path": cached_png,
-                    "duration": duration,
-                    "show_progress_bar": show_progress_bar,
-                    "bar_color": bar_color,
-                    "bar_height": bar_height,
-                    "title": title,
-                    "show_page_number": show_page_number,
-                    "show_countdown": show_countdown,
-                    "until": until,
-                    "page": page_num,
-                    "total_pages": total_pages,
-                })
+        for page_num, cached_png, levels, _ in pages:
+            slides.append({
+                "path": cached_png,
+                "thumb_path": levels.get("thumb"),
+                "duration": duration,
+                "show_progress_bar": show_progress_bar,
+                "bar_color": bar_color,
+                "bar_height": bar_height,
+                "title": title,
+                "show_page_number": show_page_number,
+                "show_countdown": show_countdown,
+                "until": until,
+                "page": page_num,
+                "total_pages": total_pages,
+            })
 
     return slides
 
@@ -754,7 +753,7 @@ function renderOverview() {
       wrap.className = 'thumb-img-wrap';
 
       const img = document.createElement('img');
-      img.src = slide.src;
+      img.src = slide.thumb || slide.src;
       img.alt = `Slide ${i + 1}`;
       img.loading = 'lazy';
       wrap.appendChild(img);
@@ -1097,19 +1096,27 @@ def export(config, output_dir: Path):
         print("No slides found.")
         return
 
-    # Create output/slides directory
+    # Create output/slides and output/slides/thumbs directories
     slides_out = output_dir / "slides"
-    slides_out.mkdir(parents=True, exist_ok=True)
+    thumbs_out = slides_out / "thumbs"
+    thumbs_out.mkdir(parents=True, exist_ok=True)
 
-    # Copy PNGs with sequential names
+    # Copy PNGs with sequential names (converting other cache formats to PNG)
     slide_data = []
     for i, slide in enumerate(slides_raw):
         dst_name = f"{i:04d}.png"
         dst = slides_out / dst_name
-        shutil.copy2(slide["path"], dst)
+        convert_to_png(slide["path"], dst)
+
+        # Overview thumbnails use the pre-rendered small rendition when cached
+        thumb_src = None
+        if slide["thumb_path"] is not None:
+            convert_to_png(slide["thumb_path"], thumbs_out / dst_name)
+            thumb_src = f"slides/thumbs/{dst_name}"
 
         slide_data.append({
             "src": f"slides/{dst_name}",
+            "thumb": thumb_src,
             "duration": slide["duration"],
             "until": slide["until"],
             "show_progress_bar": slide["show_progress_bar"],
@@ -1152,6 +1159,10 @@ def main():
     parser.add_argument(
         "--config", "-c", default="config.toml", help="Config file (default: config.toml)"
     )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=None,
+        help="Render worker processes (default: render_workers setting, 0 = all cores)",
+    )
 
     args = parser.parse_args()
     output_dir = Path(args.output)
@@ -1164,7 +1175,7 @@ def main():
         config = load_config(args.config)
 
         print("Preparing slide images...")
-        prepare_slide_images(config)
+        prepare_slide_images(config, jobs=args.jobs)
 
         export(config, output_dir)
     finally: